@@ -1,13 +1,41 @@
 import streamlit as st
 import csv
 import hashlib
+import hmac
 import os
 from pathlib import Path
 from datetime import datetime, timedelta
 import uuid 
 import re 
+import json
+import sqlite3
+import threading
+import atexit
+import logging
+import time
+import heapq
+import bisect
+import math
+from contextlib import contextmanager
+from functools import partial
+from collections import OrderedDict, Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
 import pandas as pd 
-from io import BytesIO 
+import numpy as np
+from io import BytesIO, StringIO, TextIOWrapper
+from openpyxl import Workbook
+from PIL import Image, ImageOps
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Parquet export is offered only when pyarrow is installed
+    pa = pq = None
 import streamlit as st
 
 # FIX
@@ -17,6 +45,7 @@ if "language" not in st.session_state:
 st.set_page_config(page_title="System Title", page_icon="📝", layout="wide")
 
 lang = st.session_state.language
+log = logging.getLogger("grievance_portal")
 # -------------------------
 # Config / file locations
 # -------------------------
@@ -26,9 +55,14 @@ COMPLAINTS_CSV = BASE_DIR / "complaints.csv"
 ANNOUNCEMENTS_CSV = BASE_DIR / "announcements.csv"
 POSTS_CSV = BASE_DIR / "posts.csv"
 FEEDBACK_CSV = BASE_DIR / "feedback.csv" 
+VOTES_CSV = BASE_DIR / "votes.csv"
+COMPLAINT_STATS_CSV = BASE_DIR / "complaint_stats.csv"
+HOTSPOT_CELLS_CSV = BASE_DIR / "hotspot_cells.csv"
 # -------------------------
 UPLOAD_DIR = BASE_DIR / "uploads"
 UPLOAD_DIR.mkdir(exist_ok=True) 
+EXPORT_DIR = BASE_DIR / "exports" # finished background export files
+THUMBNAIL_DIR = BASE_DIR / "thumbnails" # resized copies of image attachments (safe to delete)
 
 # -------------------------
 # Define the specific region this portal serves
@@ -39,209 +73,88 @@ TARGET_REGION = "Park View Colony"
 # NEW: Language and Translation Support
 # -------------------------
 
-# Kannada strings for translation (Standardized to English keys)
-TRANSLATIONS = {
-    "en": {
-        # General
-        "system_title": "🏛️ Public Grievance Redressal System",
-        "region_name": TARGET_REGION,
-        "region_admin": "Administration",
-        "log_in": "Log In",
-        "log_out": "Log Out",
-        "profile": "Profile",
-        "authenticated": "Authenticated",
-        "role": "Role",
-        "citizen": "Citizen",
-        "administrator": "Administrator",
-        "registered_details": "Registered Details",
-        "area_code": "Area Code",
-        "password": "Password",
-        "username": "Username",
-        "access_required": "User authentication is required to access public services.",
-        "welcome_message": "Welcome. I am the **Digital Assistant** for this portal. Please state your query regarding services like Grievances, Announcements, or Community Board.",
-        "system_login": "System Login",
-        "authenticate_button": "Authenticate and Log In",
-        "credential_admin": "Administration Account: Area **9000**, User **admin** / Pass **password**",
-        "credential_citizen": "Citizen Account Example: Area **1234**, User **resident** / Pass **password**",
-        
-        # Citizen Tabs
-        "tab_announcements": "Official Announcements",
-        "tab_raise_grievance": "File New Grievance",
-        "tab_status_tracking": "Grievance Status Tracking",
-        "tab_community": "Community Board",
-        "tab_assistant": "Digital Assistant",
-        
-        # Citizen UI
-        "file_grievance_title": "File New Grievance: Public Issue Reporting",
-        "file_grievance_info": "Please complete all mandatory fields. The system will automatically classify the priority of your grievance.",
-        "submit_grievance": "Submit Formal Grievance",
-        "name_input": "Complainant's Full Name",
-        "house_input": "Registered Address / Property Identification",
-        "house_placeholder": "E.g., Flat 101, Block B or Plot No. 45",
-        "grievance_category": "Grievance Category",
-        "grievance_desc": "Detailed Description of the Grievance",
-        "grievance_desc_placeholder": "Clearly describe the nature of the issue, its precise location, and the impact on the community. Use keywords like 'emergency' or 'critical' if necessary.",
-        "attachment_header": "Supporting Documentation",
-        "attachment_upload": "Upload Supporting Document or Photograph",
-        "status_tracking_title": "Grievance Status Tracking",
-        "no_grievances": "No grievances have been registered under your account yet.",
-        "resolution_status": "Resolution Status and Administrative Notes",
-        "notes_caption": "The administration has not yet recorded specific notes or resolution details.",
-        "feedback_survey": "Citizen Satisfaction Survey",
-        "feedback_info": "Please rate your satisfaction with the resolution of this grievance.",
-        "feedback_rating": "Resolution Rating (Mandatory)",
-        "feedback_suggestion": "Suggestion/Comment for Improvement (Optional)",
-        "feedback_submit": "Submit Resolution Feedback",
-        "feedback_success": "Feedback submitted successfully. Your input is valued for system improvement.",
-        "posted_by": "Posted by",
-        "on_date": "on",
-        "official_post_banner": "📢 **Official Post from Administration**",
-        "community_discussions": "Discussions from {} Residents",
-        "post_subject": "Subject of Discussion",
-        "post_image_upload": "Upload Supporting Image (Optional)",
-        "post_as_admin": "Post as Admin",
-        "post_as_citizen": "Post",
-        "post_success": "The post has been submitted to the Community Board.",
-        "post_error": "Discussion content or an image attachment is required.",
-        "no_discussions": "No community discussions available at this time.",
-        
-        # Admin Tabs
-        "admin_tab_manage": "Admin Grievance Management",
-        "admin_tab_feedback": "Citizen Satisfaction Review",
-        "admin_tab_analysis": "Analysis",
-        "admin_tab_map": "Hotspot Map",
-        "admin_tab_publish": "Administrative Publishing",
-        
-        # Admin UI
-        "admin_manage_title": "Administrative Grievance Management",
-        "admin_publish_title": "Administrative Announcement Publishing",
-        "admin_content_label": "Official Circular Content",
-        "admin_content_placeholder": "Enter the text of the official announcement or circular.",
-        "admin_publish_button": "Publish Official Announcement",
-        "current_announcements": "Currently Published Official Announcements",
-        "admin_action": "Administrative Action and Assignment",
-        "update_status": "Update Grievance Status",
-        "assign_dept": "Assign Department and Record Notes",
-        "download_data": "Download ALL Grievance Data (Excel .xlsx)",
-        "admin_assignment_note": "Administrative Notes / Resolution Details",
-        "save_assignment": "💾 Save Assignment and Notes",
-        "execute_status": "Execute Status Change",
-        
-        # Complaint Details (Priority & Status Keys - MUST NOT CHANGE)
-        "priority_emergency": "Emergency",
-        "priority_high": "High Priority",
-        "priority_standard": "Standard Priority",
-        "status_open": "Open",
-        "status_in_progress": "In Progress",
-        "status_resolved": "Resolved",
-        "sla_status": "SLA Status",
-        "sla_overdue": "OVERDUE",
-        "sla_due_now": "DUE NOW",
-    },
-    "kn": {
-        # General
-        "system_title": "🏛️ ಸಾರ್ವಜನಿಕ ಕುಂದುಕೊರತೆ ನಿವಾರಣಾ ವ್ಯವಸ್ಥೆ",
-        "region_name": TARGET_REGION,
-        "region_admin": "ಆಡಳಿತ",
-        "log_in": "ಲಾಗ್ ಇನ್ ಮಾಡಿ",
-        "log_out": "ಲಾಗ್ ಔಟ್ ಮಾಡಿ",
-        "profile": "ಪ್ರೊಫೈಲ್",
-        "authenticated": "ದೃಢೀಕರಿಸಲಾಗಿದೆ",
-        "role": "ಪಾತ್ರ",
-        "citizen": "ನಾಗರಿಕ",
-        "administrator": "ನಿರ್ವಾಹಕ",
-        "registered_details": "ನೋಂದಾಯಿತ ವಿವರಗಳು",
-        "area_code": "ಪ್ರದೇಶ ಕೋಡ್",
-        "password": "ಪಾಸ್ವರ್ಡ್",
-        "username": "ಬಳಕೆದಾರ ಹೆಸರು",
-        "access_required": "ಸಾರ್ವಜನಿಕ ಸೇವೆಗಳನ್ನು ಪ್ರವೇಶಿಸಲು ಬಳಕೆದಾರರ ದೃಢೀಕರಣದ ಅಗತ್ಯವಿದೆ.",
-        "welcome_message": "ಸ್ವಾಗತ. ನಾನು ಈ ಪೋರ್ಟಲ್‌ನ **ಡಿಜಿಟಲ್ ಸಹಾಯಕ**. ದಯವಿಟ್ಟು ಕುಂದುಕೊರತೆ, ಪ್ರಕಟಣೆಗಳು ಅಥವಾ ಸಮುದಾಯ ಮಂಡಳಿಯಂತಹ ಸೇವೆಗಳ ಕುರಿತು ನಿಮ್ಮ ಪ್ರಶ್ನೆಯನ್ನು ತಿಳಿಸಿ.",
-        "system_login": "ವ್ಯವಸ್ಥೆಯ ಲಾಗಿನ್",
-        "authenticate_button": "ದೃಢೀಕರಿಸಿ ಮತ್ತು ಲಾಗ್ ಇನ್ ಮಾಡಿ",
-        "credential_admin": "ಆಡಳಿತ ಖಾತೆ: ಪ್ರದೇಶ **9000**, ಬಳಕೆದಾರ **admin** / ಪಾಸ್ವರ್ಡ್ **password**",
-        "credential_citizen": "ನಾಗರಿಕ ಖಾತೆ ಉದಾಹರಣೆ: ಪ್ರದೇಶ **1234**, ಬಳಕೆದಾರ **resident** / ಪಾಸ್ವರ್ಡ್ **password**",
-        
-        # Citizen Tabs
-        "tab_announcements": "ಅಧಿಕೃತ ಪ್ರಕಟಣೆಗಳು",
-        "tab_raise_grievance": "ಹೊಸ ಕುಂದುಕೊರತೆ ಸಲ್ಲಿಸಿ",
-        "tab_status_tracking": "ಕುಂದುಕೊರತೆ ಸ್ಥಿತಿ ಟ್ರ್ಯಾಕಿಂಗ್",
-        "tab_community": "ಸಮುದಾಯ ಮಂಡಳಿ",
-        "tab_assistant": "ಡಿಜಿಟಲ್ ಸಹಾಯಕ",
-        
-        # Citizen UI
-        "file_grievance_title": "ಹೊಸ ಕುಂದುಕೊರತೆ ಸಲ್ಲಿಸಿ: ಸಾರ್ವಜನಿಕ ಸಮಸ್ಯೆ ವರದಿ",
-        "file_grievance_info": "ದಯವಿಟ್ಟು ಎಲ್ಲಾ ಕಡ್ಡಾಯ ಕ್ಷೇತ್ರಗಳನ್ನು ಭರ್ತಿ ಮಾಡಿ. ನಿಮ್ಮ ಕುಂದುಕೊರತೆಯ ಆದ್ಯತೆಯನ್ನು ವ್ಯವಸ್ಥೆಯು ಸ್ವಯಂಚಾಲಿತವಾಗಿ ವರ್ಗೀಕರಿಸುತ್ತದೆ.",
-        "submit_grievance": "ಔಪಚಾರಿಕ ಕುಂದುಕೊರತೆ ಸಲ್ಲಿಸಿ",
-        "name_input": "ಕುಂದುಕೊರತೆದಾರರ ಪೂರ್ಣ ಹೆಸರು",
-        "house_input": "ನೋಂದಾಯಿತ ವಿಳಾಸ / ಆಸ್ತಿ ಗುರುತಿಸುವಿಕೆ",
-        "house_placeholder": "ಉದಾ. ಫ್ಲಾಟ್ 101, ಬ್ಲಾಕ್ ಬಿ ಅಥವಾ ಪ್ಲಾಟ್ ನಂ. 45",
-        "grievance_category": "ಕುಂದುಕೊರತೆ ವರ್ಗ",
-        "grievance_desc": "ಕುಂದುಕೊರತೆಯ ವಿವರವಾದ ವಿವರಣೆ",
-        "grievance_desc_placeholder": "ಸಮಸ್ಯೆಯ ಸ್ವರೂಪ, ನಿಖರ ಸ್ಥಳ ಮತ್ತು ಸಮುದಾಯದ ಮೇಲಿನ ಪರಿಣಾಮವನ್ನು ಸ್ಪಷ್ಟವಾಗಿ ವಿವರಿಸಿ. 'ತುರ್ತು' ಅಥವಾ 'ನಿರ್ಣಾಯಕ' ನಂತಹ ಪ್ರಮುಖ ಪದಗಳನ್ನು ಬಳಸಿ.",
-        "attachment_header": "ಪೋಷಕ ದಾಖಲೆ",
-        "attachment_upload": "ಪೋಷಕ ದಾಖಲೆ ಅಥವಾ ಛಾಯಾಚಿತ್ರವನ್ನು ಅಪ್ಲೋಡ್ ಮಾಡಿ",
-        "status_tracking_title": "ಕುಂದುಕೊರತೆ ಸ್ಥಿತಿ ಟ್ರ್ಯಾಕಿಂಗ್",
-        "no_grievances": "ನಿಮ್ಮ ಖಾತೆಯ ಅಡಿಯಲ್ಲಿ ಇನ್ನೂ ಯಾವುದೇ ಕುಂದುಕೊರತೆಗಳನ್ನು ನೋಂದಾಯಿಸಲಾಗಿಲ್ಲ.",
-        "resolution_status": "ಪರಿಹಾರದ ಸ್ಥಿತಿ ಮತ್ತು ಆಡಳಿತಾತ್ಮಕ ಟಿಪ್ಪಣಿಗಳು",
-        "notes_caption": "ಆಡಳಿತವು ಇನ್ನೂ ನಿರ್ದಿಷ್ಟ ಟಿಪ್ಪಣಿಗಳು ಅಥವಾ ಪರಿಹಾರ ವಿವರಗಳನ್ನು ದಾಖಲಿಸಿಲ್ಲ.",
-        "feedback_survey": "ನಾಗರಿಕರ ತೃಪ್ತಿ ಸಮೀಕ್ಷೆ",
-        "feedback_info": "ದಯವಿಟ್ಟು ಈ ಕುಂದುಕೊರತೆಯ ಪರಿಹಾರದ ಕುರಿತು ನಿಮ್ಮ ತೃಪ್ತಿಯನ್ನು ರೇಟ್ ಮಾಡಿ.",
-        "feedback_rating": "ಪರಿಹಾರ ರೇಟಿಂಗ್ (ಕಡ್ಡಾಯ)",
-        "feedback_suggestion": "ಸುಧಾರಣೆಗಾಗಿ ಸಲಹೆ/ಟಿಪ್ಪಣಿ (ಐಚ್ಛಿಕ)",
-        "feedback_submit": "ಪರಿಹಾರ ಪ್ರತಿಕ್ರಿಯೆ ಸಲ್ಲಿಸಿ",
-        "feedback_success": "ಪ್ರತಿಕ್ರಿಯೆಯನ್ನು ಯಶಸ್ವಿಯಾಗಿ ಸಲ್ಲಿಸಲಾಗಿದೆ. ನಿಮ್ಮ ಇನ್‌ಪುಟ್ ಅನ್ನು ಸಿಸ್ಟಮ್ ಸುಧಾರಣೆಗಾಗಿ ಮೌಲ್ಯಯುತವಾಗಿದೆ.",
-        "posted_by": "ಪೋಸ್ಟ್ ಮಾಡಿದವರು",
-        "on_date": "ದಿನಾಂಕ",
-        "official_post_banner": "📢 **ಆಡಳಿತದಿಂದ ಅಧಿಕೃತ ಪೋಸ್ಟ್**",
-        "community_discussions": "{} ನಿವಾಸಿಗಳಿಂದ ಚರ್ಚೆಗಳು",
-        "post_subject": "ಚರ್ಚೆಯ ವಿಷಯ",
-        "post_image_upload": "ಪೋಷಕ ಚಿತ್ರವನ್ನು ಅಪ್ಲೋಡ್ ಮಾಡಿ (ಐಚ್ಛಿಕ)",
-        "post_as_admin": "ನಿರ್ವಾಹಕರಾಗಿ ಪೋಸ್ಟ್ ಮಾಡಿ",
-        "post_as_citizen": "ಪೋಸ್ಟ್ ಮಾಡಿ",
-        "post_success": "ಪೋಸ್ಟ್ ಅನ್ನು ಸಮುದಾಯ ಮಂಡಳಿಗೆ ಸಲ್ಲಿಸಲಾಗಿದೆ.",
-        "post_error": "ಚರ್ಚೆಯ ವಿಷಯ ಅಥವಾ ಚಿತ್ರದ ಲಗತ್ತು ಅಗತ್ಯವಿದೆ.",
-        "no_discussions": "ಈ ಸಮಯದಲ್ಲಿ ಯಾವುದೇ ಸಮುದಾಯ ಚರ್ಚೆಗಳು ಲಭ್ಯವಿಲ್ಲ.",
-        
-        # Admin Tabs
-        "admin_tab_manage": "ನಿರ್ವಾಹಕ ಕುಂದುಕೊರತೆ ನಿರ್ವಹಣೆ",
-        "admin_tab_feedback": "ನಾಗರಿಕರ ತೃಪ್ತಿ ವಿಮರ್ಶೆ",
-        "admin_tab_analysis": "ವಿಶ್ಲೇಷಣೆ",
-        "admin_tab_map": "ಹಾಟ್‌ಸ್ಪಾಟ್ ನಕ್ಷೆ",
-        "admin_tab_publish": "ಆಡಳಿತಾತ್ಮಕ ಪ್ರಕಟಣೆ",
-        
-        # Admin UI
-        "admin_manage_title": "ಆಡಳಿತಾತ್ಮಕ ಕುಂದುಕೊರತೆ ನಿರ್ವಹಣೆ",
-        "admin_publish_title": "ಆಡಳಿತಾತ್ಮಕ ಪ್ರಕಟಣೆ ಪ್ರಕಟಣೆ",
-        "admin_content_label": "ಅಧಿಕೃತ ಸುತ್ತೋಲೆಯ ವಿಷಯ",
-        "admin_content_placeholder": "ಅಧಿಕೃತ ಪ್ರಕಟಣೆ ಅಥವಾ ಸುತ್ತೋಲೆಯ ವಿಷಯವನ್ನು ನಮೂದಿಸಿ.",
-        "admin_publish_button": "ಅಧಿಕೃತ ಪ್ರಕಟಣೆ ಪ್ರಕಟಿಸಿ",
-        "current_announcements": "ಪ್ರಸ್ತುತ ಪ್ರಕಟಿಸಲಾದ ಅಧಿಕೃತ ಪ್ರಕಟಣೆಗಳು",
-        "admin_action": "ಆಡಳಿತಾತ್ಮಕ ಕ್ರಮ ಮತ್ತು ನಿಯೋಜನೆ",
-        "update_status": "ಕುಂದುಕೊರತೆ ಸ್ಥಿತಿಯನ್ನು ನವೀಕರಿಸಿ",
-        "assign_dept": "ವಿಭಾಗವನ್ನು ನಿಯೋಜಿಸಿ ಮತ್ತು ಟಿಪ್ಪಣಿಗಳನ್ನು ದಾಖಲಿಸಿ",
-        "download_data": "ಎಲ್ಲಾ ಕುಂದುಕೊರತೆ ಡೇಟಾವನ್ನು ಡೌನ್‌ಲೋಡ್ ಮಾಡಿ (Excel .xlsx)",
-        "admin_assignment_note": "ಆಡಳಿತಾತ್ಮಕ ಟಿಪ್ಪಣಿಗಳು / ಪರಿಹಾರ ವಿವರಗಳು",
-        "save_assignment": "💾 ನಿಯೋಜನೆ ಮತ್ತು ಟಿಪ್ಪಣಿಗಳನ್ನು ಉಳಿಸಿ",
-        "execute_status": "ಸ್ಥಿತಿಯ ಬದಲಾವಣೆಯನ್ನು ಕಾರ್ಯಗತಗೊಳಿಸಿ",
-        
-        # Complaint Details (Priority & Status Keys - MUST NOT CHANGE)
-        "priority_emergency": "ತುರ್ತು",
-        "priority_high": "ಹೆಚ್ಚಿನ ಆದ್ಯತೆ",
-        "priority_standard": "ಪ್ರಮಾಣಿತ ಆದ್ಯತೆ",
-        "status_open": "ತೆರೆದಿದೆ",
-        "status_in_progress": "ಪ್ರಗತಿಯಲ್ಲಿದೆ",
-        "status_resolved": "ಪರಿಹಾರವಾಗಿದೆ",
-        "sla_status": "SLA ಸ್ಥಿತಿ",
-        "sla_overdue": "ಕಾಲಾವಧಿ ಮೀರಿದೆ",
-        "sla_due_now": "ಈಗ ಬಾಕಿ ಇದೆ",
-    }
-}
+LOCALE_DIR = BASE_DIR / "locales" # one JSON catalogue per language: {"message_key": "template"}
+SOURCE_LANGUAGE = "en" # keys without a catalogue entry are English text and are shown as written
+MESSAGE_KEY = re.compile(r"[a-z0-9_]+$") # identifier-style keys always need a catalogue entry
+TEMPLATE_DEFAULTS = {"region": TARGET_REGION}
+
+class TemplateParams(dict):
+    """format_map() arguments; unknown fields stay in place for a later format_map()."""
+
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+class Catalogue:
+    """Locale catalogues from LOCALE_DIR, each file read once per process on first use.
+
+    Templates use str.format fields (`{username}`) filled from the call's
+    keyword arguments and TEMPLATE_DEFAULTS. A lookup that falls back to
+    English (or, for an identifier key, to the key itself) is counted in
+    `misses` per (language, key), so admins can see what is untranslated.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.locales = {} # language -> (messages, keys whose template has fields)
+        self.misses = Counter()
+        self.lock = threading.Lock()
+
+    def load(self, lang):
+        compiled = self.locales.get(lang)
+        if compiled is None:
+            path = self.directory / f"{lang}.json"
+            messages = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+            compiled = (messages, frozenset(key for key, text in messages.items() if "{" in text))
+            with self.lock:
+                compiled = self.locales.setdefault(lang, compiled)
+        return compiled
+
+    def messages(self, lang):
+        return self.load(lang)[0]
+
+    def reload(self):
+        """Re-reads the locale files on next use (miss counters are kept)."""
+        with self.lock:
+            self.locales.clear()
+
+    def record_miss(self, lang, key):
+        with self.lock:
+            self.misses[(lang, key)] += 1
+
+    def translator(self, lang):
+        """t(key, **params) bound to one language, so lookups skip st.session_state."""
+        messages, templated = self.load(lang)
+        fallback, fallback_templated = self.load(SOURCE_LANGUAGE)
+
+        def translate(key, **params):
+            text = messages.get(key)
+            if text is not None:
+                if params or key in templated:
+                    return text.format_map(TemplateParams(TEMPLATE_DEFAULTS, **params))
+                return text
+            if key and (lang != SOURCE_LANGUAGE or MESSAGE_KEY.match(key)):
+                self.record_miss(lang, key)
+            text = fallback.get(key, key) # Fallback to English, then to the key itself
+            if params or key in fallback_templated:
+                return text.format_map(TemplateParams(TEMPLATE_DEFAULTS, **params))
+            return text
+
+        return translate
+
+    def miss_report(self):
+        """Rows of (language, key, hits), most frequent first."""
+        with self.lock:
+            return [(lang, key, hits) for (lang, key), hits in self.misses.most_common()]
+
+
+@st.cache_resource
+def get_catalogue():
+    """Process-wide translation catalogue (locale files are read lazily)."""
+    return Catalogue(LOCALE_DIR)
 
-# Function to fetch translation
-def t(key):
-    """Fetches the translated string for the current language."""
-    lang = st.session_state.language
-    return TRANSLATIONS.get(lang, {}).get(key, key) # Fallback to key if not found
+# Bound once per rerun; set_language() reruns the script, which rebinds it.
+t = get_catalogue().translator(lang)
 
 
 def set_language(lang):
@@ -251,202 +164,2419 @@ def set_language(lang):
 # -------------------------
 # Utilities (Functions) - Updated to use t()
 # -------------------------
+PRIORITY_RULES_JSON = BASE_DIR / "priority_rules.json" # keywords (English and Kannada) per priority level
+
+class PriorityClassifier:
+    """Priority rules from PRIORITY_RULES_JSON compiled into one regex.
+
+    Each level contributes an optional lookahead with a named group, so a
+    single match() reports which levels have a keyword anywhere in the text.
+    Levels are tried in file order; `when` decides whether a level needs its
+    keyword, a high-risk category, or both.
+    """
+
+    def __init__(self, path):
+        rules = json.loads(Path(path).read_text(encoding="utf-8"))
+        self.high_risk = set(rules["high_risk_categories"])
+        self.levels = rules["levels"]
+        self.default = rules["default"]
+        self.patterns = []
+        for level in self.levels:
+            keywords = [k.lower() for words in level["keywords"].values() for k in words]
+            self.patterns.append("|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)) or "(?!)")
+        self.matcher = re.compile("".join(f"(?=[\\s\\S]*?(?P<level{i}>{p}))?" for i, p in enumerate(self.patterns)))
+
+    @staticmethod
+    def applies(when, keyword, high_risk):
+        """Level condition; works on single bools and on boolean arrays alike."""
+        if when == "keyword_and_category":
+            return keyword & high_risk
+        if when == "keyword_or_category":
+            return keyword | high_risk
+        return keyword
+
+    def classify(self, category, description):
+        """(priority key, SLA days) for one complaint."""
+        found = self.matcher.match(description.lower())
+        high_risk = category in self.high_risk
+        for i, level in enumerate(self.levels):
+            if self.applies(level["when"], found.group(f"level{i}") is not None, high_risk):
+                return level["priority"], level["sla_days"]
+        return self.default["priority"], self.default["sla_days"]
+
+    def classify_batch(self, categories, descriptions):
+        """Priority keys and SLA days for many complaints, as two pandas Series.
+
+        Keyword matching runs column-wise (Arrow string kernels when pyarrow is
+        installed) instead of one Python call per row.
+        """
+        text = pd.Series(descriptions, dtype="string[pyarrow]" if pa is not None else "string").fillna("").str.lower()
+        high_risk = pd.Series(categories).isin(self.high_risk).to_numpy()
+        priority = pd.Series(self.default["priority"], index=text.index)
+        sla_days = pd.Series(self.default["sla_days"], index=text.index)
+        decided = pd.Series(False, index=text.index).to_numpy()
+        for level, pattern in zip(self.levels, self.patterns):
+            keyword = text.str.contains(pattern, regex=True).fillna(False).to_numpy(dtype=bool)
+            hit = self.applies(level["when"], keyword, high_risk) & ~decided
+            priority[hit] = level["priority"]
+            sla_days[hit] = level["sla_days"]
+            decided = decided | hit
+        return priority, sla_days
+
+
+@st.cache_resource(max_entries=1)
+def load_priority_classifier(rules_mtime):
+    """Compiles the rule file once per version (`rules_mtime` is the cache key)."""
+    return PriorityClassifier(PRIORITY_RULES_JSON)
+
+def get_priority_classifier():
+    """The compiled classifier, reloaded when the rule file changes on disk."""
+    return load_priority_classifier(PRIORITY_RULES_JSON.stat().st_mtime_ns)
+
 def determine_priority_and_sla(category: str, description: str) -> tuple[str, str]:
     """
     Categorizes the complaint into Emergency, High, or Standard Priority 
     and assigns an SLA due date. 
-    (Logic remains English/Keyword-based for reliability)
+    (Keyword rules live in priority_rules.json, English and Kannada)
+    """
+    # Priority strings must match the keys used in the t() function's dictionary for consistency
+    priority_key, sla_days = get_priority_classifier().classify(category, description)
+    
+    # Calculate SLA due date
+    sla_due_date = datetime.utcnow() + timedelta(days=sla_days)
+    
+    return priority_key, sla_due_date.isoformat() # Return the KEY
+
+PASSWORD_KDF = "pbkdf2_sha256"
+PASSWORD_ITERATIONS = int(os.environ.get("GRIEVANCE_PASSWORD_ITERATIONS", "600000")) # raise over time; logins upgrade old hashes
+PASSWORD_SALT_BYTES = 16
+
+def hash_password(plain: str) -> str:
+    """Salted PBKDF2 hash, stored as 'pbkdf2_sha256$<iterations>$<salt hex>$<digest hex>'."""
+    salt = os.urandom(PASSWORD_SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", plain.encode("utf-8"), salt, PASSWORD_ITERATIONS)
+    return f"{PASSWORD_KDF}${PASSWORD_ITERATIONS}${salt.hex()}${digest.hex()}"
+
+def check_password(plain: str, stored: str) -> bool:
+    """Whether `plain` matches a stored hash (PBKDF2, or the legacy unsalted SHA-256 hex)."""
+    if "$" not in stored:
+        return hmac.compare_digest(stored, hashlib.sha256(plain.encode("utf-8")).hexdigest())
+    try:
+        kdf, iterations, salt, digest = stored.split("$")
+        if kdf != PASSWORD_KDF:
+            return False
+        computed = hashlib.pbkdf2_hmac("sha256", plain.encode("utf-8"), bytes.fromhex(salt), int(iterations))
+        return hmac.compare_digest(computed, bytes.fromhex(digest))
+    except ValueError: # malformed hash
+        return False
+
+def password_needs_rehash(stored: str) -> bool:
+    """True for legacy hashes and for PBKDF2 hashes made with other settings."""
+    return not stored.startswith(f"{PASSWORD_KDF}${PASSWORD_ITERATIONS}$")
+
+# -------------------------
+# File Safety: cross-process locks, atomic rewrites, snapshot reads
+# -------------------------
+class LockMetrics:
+    """Process-wide writer-lock counters: acquisitions, contention, wait and hold times."""
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self.locks = {}
+
+    def record(self, name, contended, wait, hold):
+        with self._guard:
+            m = self.locks.setdefault(name, {"acquisitions": 0, "contended": 0, "total_wait_s": 0.0, "max_wait_s": 0.0, "total_hold_s": 0.0})
+            m["acquisitions"] += 1
+            m["contended"] += int(contended)
+            m["total_wait_s"] += wait
+            m["max_wait_s"] = max(m["max_wait_s"], wait)
+            m["total_hold_s"] += hold
+
+    def snapshot(self):
+        """One row per lock, with the average wait in milliseconds."""
+        with self._guard:
+            return [
+                {"lock": name, **m, "avg_wait_ms": round(1000 * m["total_wait_s"] / m["acquisitions"], 3)}
+                for name, m in sorted(self.locks.items())
+            ]
+
+@st.cache_resource
+def get_lock_metrics():
+    """Returns the process-wide LockMetrics (survives script reruns)."""
+    return LockMetrics()
+
+def _try_lock(fd, blocking):
+    """Takes an exclusive OS lock on `fd`; returns False if non-blocking and busy."""
+    if fcntl is not None:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            return True
+        except BlockingIOError:
+            return False
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.01)
+
+@contextmanager
+def file_lock(path):
+    """Exclusive cross-process writer lock held on '<path>.lock'.
+
+    Every writer of a data file goes through this lock; readers never take it.
+    Wait and hold times are recorded in get_lock_metrics().
+    """
+    lock_path = Path(str(path) + ".lock")
+    with open(lock_path, "a+b") as f:
+        started = time.perf_counter()
+        contended = not _try_lock(f.fileno(), blocking=False)
+        if contended:
+            _try_lock(f.fileno(), blocking=True)
+        acquired = time.perf_counter()
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            get_lock_metrics().record(Path(path).name, contended, acquired - started, time.perf_counter() - acquired)
+
+def fsync_dir(directory):
+    """Flushes a directory entry after a rename (no-op where unsupported)."""
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+@contextmanager
+def atomic_replace(path):
+    """Yields a temp path next to `path`; on success it is fsynced and renamed over `path`.
+
+    Readers holding the old file keep a complete copy, new readers get the
+    complete new one; nobody ever sees a truncated file.
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        yield tmp
+        with open(tmp, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        fsync_dir(path.parent)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def write_csv_atomic(path, fieldnames, rows):
+    """Rewrites a whole CSV file through atomic_replace()."""
+    with atomic_replace(path) as tmp:
+        with tmp.open("w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+            w.writeheader()
+            w.writerows(rows)
+
+def append_text(path, text):
+    """Appends a record with a single O_APPEND write (callers hold the writer lock)."""
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, text.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+def read_csv_rows(path):
+    """Reads a snapshot of a CSV file into a list of dicts (empty list if missing).
+
+    The file is read in one go; a trailing row without its line terminator
+    belongs to an append still in flight and is left out.
+    """
+    try:
+        with Path(path).open("r", newline="", encoding="utf-8") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return []
+    if text and not text.endswith("\n"):
+        text = text[: text.rfind("\n") + 1]
+    return list(csv.DictReader(StringIO(text, newline="")))
+
+# Canonical column order for every data table
+COMPLAINT_HEADER = ["id","username","name","house","category","description","attachment","created_at","status","department","admin_notes","latitude","longitude","sla_due","priority","duplicate_of"]
+USER_HEADER = ["id","username","password_hash","is_admin","region","area_code"] 
+POST_HEADER = ["id","username","region","content","created_at", "votes", "attachment"] 
+FEEDBACK_HEADER = ["complaint_id", "username", "rating", "suggestion", "created_at"] 
+ANNOUNCEMENT_HEADER = ["id","author","content","created_at", "attachment"] 
+VOTE_HEADER = ["post_id", "username", "created_at"]
+COMPLAINT_STATS_HEADER = ["key", "dimension", "value", "status", "count"]
+HOTSPOT_CELLS_HEADER = ["key", "precision", "cell", "category", "priority", "status", "count"]
+
+@st.cache_resource
+def ensure_files_exist():
+    """Checks for required CSV files and ensures they have the correct headers and initial data.
+
+    Runs once per server process rather than on every rerun.
+    """
+    # 1. USERS_CSV Setup
+    with file_lock(USERS_CSV):
+        if len(read_csv_rows(USERS_CSV)) == 0:
+            seed_users = [
+                [str(uuid.uuid4()), "admin", hash_password("password"), "1", TARGET_REGION, "9000"],
+                [str(uuid.uuid4()), "resident", hash_password("password"), "0", TARGET_REGION, "1234"],
+                [str(uuid.uuid4()), "neighbor", hash_password("pass123"), "0", TARGET_REGION, "5678"],
+                [str(uuid.uuid4()), "outsider", hash_password("test"), "0", "Riverwood Heights", "9999"],
+            ]
+            write_csv_atomic(USERS_CSV, USER_HEADER, [dict(zip(USER_HEADER, u)) for u in seed_users])
+            
+    # 2-5. COMPLAINTS, ANNOUNCEMENTS, POSTS and FEEDBACK: header-only files
+    for path, header in [
+        (COMPLAINTS_CSV, COMPLAINT_HEADER),
+        (ANNOUNCEMENTS_CSV, ANNOUNCEMENT_HEADER),
+        (POSTS_CSV, POST_HEADER),
+        (FEEDBACK_CSV, FEEDBACK_HEADER),
+        (VOTES_CSV, VOTE_HEADER),
+        (COMPLAINT_STATS_CSV, COMPLAINT_STATS_HEADER),
+        (HOTSPOT_CELLS_CSV, HOTSPOT_CELLS_HEADER),
+    ]:
+        if not path.exists():
+            with file_lock(path):
+                if not path.exists():
+                    write_csv_atomic(path, header, [])
+            
+ensure_files_exist()
+
+# -------------------------
+# Storage Layer (pluggable engine; SQLite by default, CSV kept for import/export)
+# -------------------------
+# "sqlite" (default) or "csv" (legacy flat files)
+STORAGE_BACKEND = os.environ.get("GRIEVANCE_STORAGE_BACKEND", "sqlite").lower()
+DB_PATH = BASE_DIR / "grievance_portal.db"
+SQLITE_BUSY_TIMEOUT_MS = 30000 # how long a writer waits for another connection's write lock
+
+# CSV engine: the '<table>.log' delta log is folded into the base file past either threshold
+DELTA_LOG_COMPACT_BYTES = 256 * 1024
+DELTA_LOG_COMPACT_AGE = timedelta(minutes=10)
+
+# Table name -> (CSV file, canonical header, lookup key column)
+TABLES = {
+    "users": (USERS_CSV, USER_HEADER, "id"),
+    "complaints": (COMPLAINTS_CSV, COMPLAINT_HEADER, "id"),
+    "announcements": (ANNOUNCEMENTS_CSV, ANNOUNCEMENT_HEADER, "id"),
+    "posts": (POSTS_CSV, POST_HEADER, "id"),
+    "feedback": (FEEDBACK_CSV, FEEDBACK_HEADER, "complaint_id"),
+    "votes": (VOTES_CSV, VOTE_HEADER, "post_id"),
+    "complaint_stats": (COMPLAINT_STATS_CSV, COMPLAINT_STATS_HEADER, "key"),
+    "hotspot_cells": (HOTSPOT_CELLS_CSV, HOTSPOT_CELLS_HEADER, "key"),
+}
+
+# Sort weight of each priority KEY (Emergency first)
+PRIORITY_RANK = {"priority_emergency": 3, "priority_high": 2, "priority_standard": 1}
+
+# Secondary indexes built by the SQLite engine (the key column is always indexed)
+TABLE_INDEXES = {
+    "users": ["username"],
+    "complaints": ["username", "status", "priority", "sla_due", "department"],
+    "posts": ["region"],
+    "feedback": ["username"],
+    "votes": ["username"],
+    "complaint_stats": ["dimension"],
+    "hotspot_cells": ["precision"],
+}
+
+# Unique constraints: insert() returns False instead of storing a duplicate
+TABLE_UNIQUE = {
+    "votes": ("post_id", "username"),
+    "feedback": ("complaint_id", "username"),
+    "complaint_stats": ("key",),
+    "hotspot_cells": ("key",),
+}
+
+def check_columns(table, columns):
+    """Rejects column names that are not part of the table's header."""
+    header = TABLES[table][1]
+    for col in columns:
+        if col not in header:
+            raise ValueError(f"Unknown column '{col}' for table '{table}'")
+
+# Comparison operators accepted in query() filters: (column, op, value)
+QUERY_OPERATORS = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+}
+
+def check_query(table, where, order):
+    """Validates query() filters and ordering against the table header."""
+    check_columns(table, [c for c, _, _ in where] + [c for c, _, _ in order])
+    for _, op, _ in where:
+        if op not in QUERY_OPERATORS:
+            raise ValueError(f"Unsupported operator '{op}'")
+
+def clean_row(table, row):
+    """Normalises a row to the table header with string values (CSV semantics)."""
+    return {col: "" if row.get(col) is None else str(row.get(col)) for col in TABLES[table][1]}
+
+
+class CSVBackend:
+    """Legacy flat-file engine: every table is one CSV file.
+
+    Updates are not rewritten into the base file. Each one is appended to a
+    '<table>.log' delta log as a JSON line and merged on read; a background
+    compactor folds the log back into the base file once it gets too big or too old.
+    Writers serialise on file_lock(<table file>); readers take no lock.
+    """
+    name = "csv"
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._unique = {}
+        self._secondary = {}
+        self._compacting = set()
+        for table in TABLES:
+            self.repair(table)
+            if self.compacting_log(table).exists():
+                self.compact(table) # Finish a compaction interrupted by a restart
+
+    def delta_log(self, table):
+        return TABLES[table][0].with_suffix(".log")
+
+    def compacting_log(self, table):
+        return TABLES[table][0].with_suffix(".log.compacting")
+
+    def fieldnames(self, table):
+        """Column order of the file on disk (the canonical header for new files)."""
+        path, header, _ = TABLES[table]
+        if path.exists():
+            with path.open("r", newline="", encoding="utf-8") as f:
+                file_header = next(csv.reader(f), None)
+            if file_header:
+                return file_header
+        return list(header)
+
+    def repair(self, table):
+        """Adds canonical columns missing from an older file's header and
+        terminates a hand-edited last line, so appends always start on a new row."""
+        path, header, _ = TABLES[table]
+        if not path.exists():
+            return
+        with file_lock(path):
+            fieldnames = self.fieldnames(table)
+            missing = [c for c in header if c not in fieldnames]
+            unterminated = False
+            with path.open("rb") as f:
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    unterminated = f.read(1) != b"\n"
+            if missing or unterminated:
+                with path.open("r", newline="", encoding="utf-8") as f:
+                    rows = list(csv.DictReader(f))
+                write_csv_atomic(path, fieldnames + missing, rows)
+
+    @staticmethod
+    def read_deltas(path):
+        """Reads a delta log, skipping a torn last line left by a crash or an in-flight append."""
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        deltas = []
+        for line in lines:
+            try:
+                deltas.append(json.loads(line))
+            except ValueError:
+                continue
+        return deltas
+
+    @staticmethod
+    def apply_deltas(table, rows, deltas):
+        """Replays delta records over the base rows, oldest first."""
+        if not deltas:
+            return rows
+        key = TABLES[table][2]
+        by_key = {}
+        for row in rows:
+            by_key.setdefault(row.get(key), []).append(row)
+        for delta in deltas:
+            for row in by_key.get(delta.get("key"), []):
+                row.update(delta.get("changes", {}))
+        return rows
+
+    def all(self, table):
+        """Lock-free snapshot read of the base file merged with its delta logs.
+
+        The live log is read before the compacting one: if a compaction renames
+        it in between, the same deltas are replayed twice, which is harmless.
+        If the base file itself is swapped while reading, the read is retried.
+        """
+        path = TABLES[table][0]
+        for _ in range(5):
+            try:
+                f = path.open("r", newline="", encoding="utf-8")
+            except FileNotFoundError:
+                return []
+            with f:
+                base_id = os.fstat(f.fileno()).st_ino
+                text = f.read()
+            live = self.read_deltas(self.delta_log(table))
+            compacting = self.read_deltas(self.compacting_log(table))
+            try:
+                if os.stat(path).st_ino == base_id:
+                    break
+            except FileNotFoundError:
+                break
+        if text and not text.endswith("\n"):
+            text = text[: text.rfind("\n") + 1]
+        rows = list(csv.DictReader(StringIO(text, newline="")))
+        return self.apply_deltas(table, rows, compacting + live)
+
+    def version(self, table):
+        """Cheap change token: identity, size and mtime of the base file and its delta logs."""
+        token = []
+        for path in (TABLES[table][0], self.delta_log(table), self.compacting_log(table)):
+            try:
+                info = os.stat(path)
+                token.append((info.st_ino, info.st_size, info.st_mtime_ns))
+            except FileNotFoundError:
+                token.append(None)
+        return tuple(token)
+
+    def get(self, table, key_value):
+        """Row by key, served by the key column's secondary index."""
+        rows = self.secondary_index(table, TABLES[table][2])["by_key"].get(key_value)
+        return dict(rows[0]) if rows else None
+
+    def find(self, table, **equals):
+        """Rows matching every equality; the first column is served by a secondary index."""
+        check_columns(table, equals)
+        if not equals:
+            return self.all(table)
+        first, value = next(iter(equals.items()))
+        candidates = self.secondary_index(table, first)["by_value"].get(value, [])
+        return [dict(r) for r in candidates if all(r.get(c) == v for c, v in equals.items())]
+
+    def secondary_index(self, table, column):
+        """In-memory secondary index on `column` ({value: [rows]} plus {key: [rows]}).
+
+        Built from one full read, then kept current by our own inserts and
+        deltas; a write from another process changes the version token and
+        the index is rebuilt on next use.
+        """
+        version = self.version(table)
+        index = self._secondary.get((table, column))
+        if index is None or index["version"] != version:
+            key = TABLES[table][2]
+            by_value, by_key = {}, {}
+            for row in self.all(table):
+                by_value.setdefault(row.get(column), []).append(row)
+                by_key.setdefault(row.get(key), []).append(row)
+            index = {"version": version, "by_value": by_value, "by_key": by_key}
+            self._secondary[(table, column)] = index
+        return index
+
+    def note_write(self, table, before, row=None, key_value=None, changes=None):
+        """Applies our own write to the secondary indexes that were current
+        just before it (callers hold the writer lock)."""
+        after = None
+        for (index_table, column), index in self._secondary.items():
+            if index_table != table or index["version"] != before:
+                continue
+            if row is not None:
+                new_row = dict(row)
+                index["by_value"].setdefault(new_row.get(column), []).append(new_row)
+                index["by_key"].setdefault(new_row.get(TABLES[table][2]), []).append(new_row)
+            else:
+                for indexed in index["by_key"].get(key_value, []):
+                    old_value = indexed.get(column)
+                    indexed.update(changes)
+                    if indexed.get(column) != old_value:
+                        index["by_value"][old_value].remove(indexed)
+                        index["by_value"].setdefault(indexed.get(column), []).append(indexed)
+            after = after or self.version(table)
+            index["version"] = after
+
+    def page(self, table, column, value, limit, offset=0):
+        """Rows where `column` == `value`, newest first, plus their total count."""
+        check_columns(table, [column])
+        rows = self.secondary_index(table, column)["by_value"].get(value, [])
+        total = len(rows)
+        end = total - offset
+        if end <= 0:
+            return [], total
+        return [dict(r) for r in reversed(rows[max(end - limit, 0):end])], total
+
+    def query(self, table, where=(), order=(), limit=None, offset=0):
+        """Filtered, ordered page of rows plus the total match count.
+
+        `where` is a list of (column, op, value); `order` a list of
+        (column, descending, rank) where `rank` optionally maps values to sort weights.
+        """
+        check_query(table, where, order)
+        rows = [r for r in self.all(table) if all(QUERY_OPERATORS[op](r.get(c, ""), v) for c, op, v in where)]
+        for column, descending, rank in reversed(order):
+            key = (lambda r, c=column, m=rank: m.get(r.get(c), 0)) if rank else (lambda r, c=column: r.get(c, ""))
+            rows.sort(key=key, reverse=descending)
+        end = None if limit is None else offset + limit
+        return rows[offset:end], len(rows)
+
+    def distinct(self, table, column):
+        check_columns(table, [column])
+        return sorted({r.get(column, "") for r in self.all(table)})
+
+    def exists(self, table, key_value):
+        """Key membership from the key column's secondary index (a miss costs no read)."""
+        return key_value in self.secondary_index(table, TABLES[table][2])["by_key"]
+
+    def count(self, table):
+        """Number of rows, from the key column's secondary index."""
+        return len(self.secondary_index(table, TABLES[table][2])["by_key"])
+
+    def unique_keys(self, table):
+        """Values of the table's unique columns, extended from the bytes appended
+        since the last call (callers hold the writer lock)."""
+        path = TABLES[table][0]
+        cols = TABLE_UNIQUE[table]
+        inode = os.stat(path).st_ino
+        seen_inode, offset, keys = self._unique.get(table, (None, 0, None))
+        if seen_inode != inode:
+            offset, keys = 0, set()
+        with path.open("rb") as f:
+            f.seek(offset)
+            chunk = f.read()
+        chunk = chunk[: chunk.rfind(b"\n") + 1]
+        fieldnames = None if offset == 0 else self.fieldnames(table)
+        reader = csv.DictReader(StringIO(chunk.decode("utf-8"), newline=""), fieldnames=fieldnames)
+        keys.update(tuple(r.get(c) for c in cols) for r in reader)
+        self._unique[table] = (inode, offset + len(chunk), keys)
+        return keys
+
+    def insert(self, table, row):
+        path = TABLES[table][0]
+        values = clean_row(table, row)
+        with file_lock(path):
+            if table in TABLE_UNIQUE:
+                unique = self.unique_keys(table)
+                unique_value = tuple(values[c] for c in TABLE_UNIQUE[table])
+                if unique_value in unique:
+                    return False
+                unique.add(unique_value)
+            before = self.version(table) if self.has_indexes(table) else None
+            buf = StringIO()
+            csv.DictWriter(buf, fieldnames=self.fieldnames(table), extrasaction="ignore").writerow(values)
+            append_text(path, buf.getvalue())
+            if before is not None:
+                self.note_write(table, before, row=values)
+        return True
+
+    def append_delta(self, table, key_value, changes):
+        """Writes one delta record (callers hold the writer lock)."""
+        record = {
+            "key": key_value,
+            "changes": {c: "" if v is None else str(v) for c, v in changes.items()},
+            "ts": datetime.utcnow().isoformat(),
+        }
+        before = self.version(table) if self.has_indexes(table) else None
+        append_text(self.delta_log(table), json.dumps(record, ensure_ascii=False) + "\n")
+        if before is not None:
+            self.note_write(table, before, key_value=key_value, changes=record["changes"])
+
+    def has_indexes(self, table):
+        return any(index_table == table for index_table, _ in self._secondary)
+
+    def update(self, table, key_value, changes):
+        """Appends one delta record; cost does not depend on the table size."""
+        check_columns(table, changes)
+        if not self.exists(table, key_value):
+            return False
+        with file_lock(TABLES[table][0]):
+            self.append_delta(table, key_value, changes)
+        self.maybe_compact(table)
+        return True
+
+    def increment(self, table, key_value, column, amount):
+        """Adds `amount` to an integer column; the read-modify-write runs under the writer lock."""
+        check_columns(table, [column])
+        if not self.exists(table, key_value):
+            return False
+        with file_lock(TABLES[table][0]):
+            row = self.get(table, key_value)
+            if row is None:
+                return False
+            try:
+                current = int(row.get(column) or 0)
+            except ValueError:
+                current = 0
+            self.append_delta(table, key_value, {column: current + amount})
+        self.maybe_compact(table)
+        return True
+
+    def maybe_compact(self, table):
+        """Starts a background compaction once the delta log passes the size or age threshold."""
+        log = self.delta_log(table)
+        try:
+            size = log.stat().st_size
+        except FileNotFoundError:
+            return
+        if size < DELTA_LOG_COMPACT_BYTES:
+            with log.open("r", encoding="utf-8") as f:
+                first_line = f.readline()
+            try:
+                first_ts = datetime.fromisoformat(json.loads(first_line)["ts"])
+            except (ValueError, KeyError, TypeError):
+                return
+            if datetime.utcnow() - first_ts < DELTA_LOG_COMPACT_AGE:
+                return
+        with self._guard:
+            if table in self._compacting:
+                return
+            self._compacting.add(table)
+        threading.Thread(target=self.compact, args=(table,), name=f"compact-{table}", daemon=True).start()
+
+    def compact(self, table):
+        """Folds the delta log into the base CSV file.
+
+        The live log is first renamed aside so new updates keep appending to a
+        fresh one, and the merged file is built without holding the writer lock.
+        Rows inserted meanwhile are copied over just before the atomic replace.
+        A separate '<file>.compact' lock keeps to one compactor across processes.
+        """
+        path = TABLES[table][0]
+        log, compacting = self.delta_log(table), self.compacting_log(table)
+        try:
+            with file_lock(path.with_name(path.name + ".compact")):
+                with file_lock(path):
+                    if not compacting.exists():
+                        if not log.exists():
+                            return
+                        os.replace(log, compacting)
+                    snapshot_size = path.stat().st_size
+
+                with path.open("rb") as f:
+                    head = f.read(snapshot_size).decode("utf-8")
+                fieldnames = next(csv.reader(StringIO(head, newline="")), None) or TABLES[table][1]
+                rows = list(csv.DictReader(StringIO(head, newline="")))
+                rows = self.apply_deltas(table, rows, self.read_deltas(compacting))
+
+                tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+                try:
+                    with tmp.open("w", newline="", encoding="utf-8") as f:
+                        w = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+                        w.writeheader()
+                        w.writerows(rows)
+
+                    with file_lock(path):
+                        with path.open("rb") as f:
+                            f.seek(snapshot_size)
+                            tail = f.read()
+                        with tmp.open("ab") as f:
+                            f.write(tail)
+                            f.flush()
+                            os.fsync(f.fileno())
+                        os.replace(tmp, path)
+                        fsync_dir(path.parent)
+                        compacting.unlink()
+                finally:
+                    tmp.unlink(missing_ok=True)
+        finally:
+            with self._guard:
+                self._compacting.discard(table)
+
+    def next_sequence(self, name, count=1, seed=None):
+        """Reserves `count` consecutive values of a named sequence and returns the first.
+
+        The counter lives in '<name>.seq' and is bumped under a cross-process
+        file lock; `seed()` provides the starting value the first time.
+        """
+        seq_path = BASE_DIR / f"{name}.seq"
+        with file_lock(seq_path):
+            try:
+                current = int(seq_path.read_text(encoding="utf-8").strip())
+            except (FileNotFoundError, ValueError):
+                current = seed() if seed else 0
+            with atomic_replace(seq_path) as tmp:
+                tmp.write_text(str(current + count), encoding="utf-8")
+        return current + 1
+
+    def export_csv(self, table, path):
+        """Copies the table (with pending deltas applied) to another CSV file; returns the row count."""
+        rows = self.all(table)
+        write_csv_atomic(Path(path), TABLES[table][1], rows)
+        return len(rows)
+
+
+class SQLiteBackend:
+    """Embedded SQLite engine (WAL mode) with indexed lookups and single-row updates.
+
+    Tables are created from the canonical headers and seeded once from the
+    existing CSV files; export_csv() and import_csv() move data between the
+    database and those files afterwards.
+    """
+    name = "sqlite"
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self.conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with self.transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS sequences (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            for table, (csv_path, header, key) in TABLES.items():
+                cols = ", ".join(f'"{c}" TEXT NOT NULL DEFAULT \'\'' for c in header)
+                conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({cols})')
+                existing = {r["name"] for r in conn.execute(f'PRAGMA table_info("{table}")')}
+                for col in header:
+                    if col not in existing:
+                        conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{col}" TEXT NOT NULL DEFAULT \'\'')
+                for col in [key] + TABLE_INDEXES.get(table, []):
+                    conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_{col}" ON "{table}" ("{col}")')
+                if table in TABLE_UNIQUE:
+                    unique_cols = self.columns(TABLE_UNIQUE[table])
+                    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (f"uq_{table}",)).fetchone() is None:
+                        # Keep the earliest row of any duplicates recorded before the constraint existed
+                        conn.execute(f'DELETE FROM "{table}" WHERE rowid NOT IN (SELECT MIN(rowid) FROM "{table}" GROUP BY {unique_cols})')
+                    conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "uq_{table}" ON "{table}" ({unique_cols})')
+
+                # One-time import of the legacy CSV data
+                if conn.execute("SELECT 1 FROM meta WHERE key = ?", (f"imported:{table}",)).fetchone() is None:
+                    self.import_rows(conn, table)
+                    conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (f"imported:{table}", datetime.utcnow().isoformat()))
+
+    @staticmethod
+    def columns(header):
+        return ", ".join(f'"{c}"' for c in header)
+
+    def import_rows(self, conn, table):
+        """Inserts the CSV rows whose key is not stored yet, inside the current transaction; returns how many."""
+        csv_path, header, key = TABLES[table]
+        rows = [clean_row(table, r) for r in read_csv_rows(csv_path)]
+        if table not in TABLE_UNIQUE: # unique tables skip duplicates through INSERT OR IGNORE
+            stored = {r[0] for r in conn.execute(f'SELECT "{key}" FROM "{table}"')}
+            rows = [r for r in rows if r[key] not in stored]
+        if not rows:
+            return 0
+        before = conn.total_changes
+        placeholders = ", ".join("?" for _ in header)
+        conn.executemany(
+            f'INSERT OR IGNORE INTO "{table}" ({self.columns(header)}) VALUES ({placeholders})',
+            [[r[c] for c in header] for r in rows],
+        )
+        return conn.total_changes - before
+
+    def conn(self):
+        """Returns this thread's connection (Streamlit runs each session on its own thread)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction (BEGIN IMMEDIATE ... COMMIT, rolled back on error).
+
+        The write lock is first tried without waiting, like file_lock(), so busy
+        waits and hold times land in get_lock_metrics() under the database name.
+        """
+        conn = self.conn()
+        started = time.perf_counter()
+        conn.execute("PRAGMA busy_timeout = 0")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            contended = False
+        except sqlite3.OperationalError: # another connection is writing
+            contended = True
+        finally:
+            conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        if contended:
+            conn.execute("BEGIN IMMEDIATE")
+        acquired = time.perf_counter()
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            get_lock_metrics().record(self.db_path.name, contended, acquired - started, time.perf_counter() - acquired)
+
+    @staticmethod
+    def bump_version(conn, table):
+        """Advances the table's change token inside the current write transaction."""
+        conn.execute(
+            "INSERT INTO table_versions (name, version) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET version = version + 1",
+            (table,),
+        )
+
+    def version(self, table):
+        """Change token bumped by every write, from any process."""
+        row = self.conn().execute("SELECT version FROM table_versions WHERE name = ?", (table,)).fetchone()
+        return row["version"] if row else 0
+
+    def select(self, table, where="", params=()):
+        header = TABLES[table][1]
+        sql = f'SELECT {self.columns(header)} FROM "{table}" {where}'
+        return [dict(r) for r in self.conn().execute(sql, params)]
+
+    def all(self, table):
+        return self.select(table, "ORDER BY rowid")
+
+    def get(self, table, key_value):
+        key = TABLES[table][2]
+        rows = self.select(table, f'WHERE "{key}" = ? ORDER BY rowid LIMIT 1', (key_value,))
+        return rows[0] if rows else None
+
+    def exists(self, table, key_value):
+        key = TABLES[table][2]
+        return self.conn().execute(f'SELECT 1 FROM "{table}" WHERE "{key}" = ? LIMIT 1', (key_value,)).fetchone() is not None
+
+    def count(self, table):
+        return self.conn().execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+    def find(self, table, **equals):
+        check_columns(table, equals)
+        where = " AND ".join(f'"{c}" = ?' for c in equals) or "1"
+        return self.select(table, f"WHERE {where} ORDER BY rowid", tuple(equals.values()))
+
+    def query(self, table, where=(), order=(), limit=None, offset=0):
+        """Filtered, ordered page of rows plus the total match count.
+
+        `where` is a list of (column, op, value); `order` a list of
+        (column, descending, rank) where `rank` optionally maps values to sort weights.
+        Filters run in SQL against the column indexes, only the page is materialised.
+        """
+        check_query(table, where, order)
+        clauses, params = [], []
+        for column, op, value in where:
+            if op == "in":
+                values = list(value) or [None]
+                clauses.append(f'"{column}" IN ({", ".join("?" for _ in values)})')
+                params.extend(values)
+            else:
+                clauses.append(f'"{column}" {op} ?')
+                params.append(value)
+        where_sql = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        total = self.conn().execute(f'SELECT COUNT(*) FROM "{table}" {where_sql}', params).fetchone()[0]
+
+        order_terms, order_params = [], []
+        for column, descending, rank in order:
+            if rank:
+                cases = " ".join("WHEN ? THEN ?" for _ in rank)
+                order_terms.append(f'CASE "{column}" {cases} ELSE 0 END')
+                for value, weight in rank.items():
+                    order_params.extend([value, weight])
+            else:
+                order_terms.append(f'"{column}"')
+            order_terms[-1] += " DESC" if descending else " ASC"
+        order_sql = "ORDER BY " + ", ".join(order_terms + ["rowid"])
+        rows = self.select(table, f"{where_sql} {order_sql} LIMIT ? OFFSET ?", params + order_params + [-1 if limit is None else limit, offset])
+        return rows, total
+
+    def distinct(self, table, column):
+        check_columns(table, [column])
+        return [r[0] for r in self.conn().execute(f'SELECT DISTINCT "{column}" FROM "{table}" ORDER BY 1')]
+
+    def page(self, table, column, value, limit, offset=0):
+        """Rows where `column` == `value`, newest first, plus their total count (index-backed)."""
+        check_columns(table, [column])
+        total = self.conn().execute(f'SELECT COUNT(*) FROM "{table}" WHERE "{column}" = ?', (value,)).fetchone()[0]
+        rows = self.select(table, f'WHERE "{column}" = ? ORDER BY rowid DESC LIMIT ? OFFSET ?', (value, limit, offset))
+        return rows, total
+
+    def insert(self, table, row):
+        header = TABLES[table][1]
+        values = clean_row(table, row)
+        placeholders = ", ".join("?" for _ in header)
+        try:
+            with self.transaction() as conn:
+                conn.execute(f'INSERT INTO "{table}" ({self.columns(header)}) VALUES ({placeholders})', [values[c] for c in header])
+                self.bump_version(conn, table)
+        except sqlite3.IntegrityError: # Unique constraint (TABLE_UNIQUE)
+            return False
+        return True
+
+    def update(self, table, key_value, changes):
+        check_columns(table, changes)
+        if not changes:
+            return self.get(table, key_value) is not None
+        key = TABLES[table][2]
+        assignments = ", ".join(f'"{c}" = ?' for c in changes)
+        params = ["" if v is None else str(v) for v in changes.values()] + [key_value]
+        with self.transaction() as conn:
+            cur = conn.execute(f'UPDATE "{table}" SET {assignments} WHERE "{key}" = ?', params)
+            self.bump_version(conn, table)
+        return cur.rowcount > 0
+
+    def increment(self, table, key_value, column, amount):
+        """Adds `amount` to an integer column in a single statement."""
+        check_columns(table, [column])
+        key = TABLES[table][2]
+        with self.transaction() as conn:
+            cur = conn.execute(
+                f'UPDATE "{table}" SET "{column}" = CAST(CAST("{column}" AS INTEGER) + ? AS TEXT) WHERE "{key}" = ?',
+                (amount, key_value),
+            )
+            self.bump_version(conn, table)
+        return cur.rowcount > 0
+
+    def next_sequence(self, name, count=1, seed=None):
+        """Reserves `count` consecutive values of a named sequence and returns the first.
+
+        BEGIN IMMEDIATE serialises allocators across threads and processes;
+        `seed()` provides the starting value the first time.
+        """
+        with self.transaction() as conn:
+            row = conn.execute("SELECT value FROM sequences WHERE name = ?", (name,)).fetchone()
+            current = row["value"] if row else (seed() if seed else 0)
+            conn.execute(
+                "INSERT INTO sequences (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                (name, current + count),
+            )
+        return current + 1
+
+    def export_csv(self, table, path):
+        """Writes the table out in the legacy CSV layout; returns the row count."""
+        rows = self.all(table)
+        write_csv_atomic(Path(path), TABLES[table][1], rows)
+        return len(rows)
+
+    def import_csv(self, table):
+        """Re-runs the start-up import: adds CSV rows missing from the database; returns how many."""
+        with self.transaction() as conn:
+            added = self.import_rows(conn, table)
+            if added:
+                self.bump_version(conn, table)
+        return added
+
+
+@st.cache_resource
+def get_storage():
+    """Returns the process-wide storage backend selected by GRIEVANCE_STORAGE_BACKEND."""
+    if STORAGE_BACKEND == "csv":
+        return CSVBackend()
+    return SQLiteBackend(DB_PATH)
+
+# -------------------------
+# Shared Read Cache (parsed tables, keyed on the storage change token)
+# -------------------------
+READ_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+class TableCache:
+    """Process-wide LRU cache of parsed tables, shared by every session and rerun.
+
+    An entry is reused while the backend's version() token is unchanged, so a
+    rerun with no new writes only pays for the token check. Writers also call
+    invalidate() directly. Cached rows are shared: callers may reorder the
+    returned list but must not mutate the row dicts.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.entries = OrderedDict() # table -> (version, rows, approx. bytes)
+        self.bytes = 0
+        self.hits = self.misses = self.invalidations = self.evictions = 0
+
+    @staticmethod
+    def approx_size(rows):
+        return sum(100 + sum(len(k) + len(v) + 100 for k, v in r.items()) for r in rows)
+
+    def rows(self, table, storage):
+        version = storage.version(table) # Taken before the read so a concurrent write forces a reload
+        with self._lock:
+            entry = self.entries.get(table)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(table)
+                self.hits += 1
+                return list(entry[1])
+            self.misses += 1
+        rows = storage.all(table)
+        self.store(table, version, rows)
+        return list(rows)
+
+    def store(self, table, version, rows):
+        size = self.approx_size(rows)
+        with self._lock:
+            old = self.entries.pop(table, None)
+            if old is not None:
+                self.bytes -= old[2]
+            if size > self.max_bytes:
+                return
+            self.entries[table] = (version, rows, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, table):
+        with self._lock:
+            old = self.entries.pop(table, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "cached_tables": len(self.entries),
+                "approx_mb": round(self.bytes / (1024 * 1024), 2),
+            }
+
+
+@st.cache_resource
+def get_table_cache():
+    """Returns the process-wide TableCache."""
+    return TableCache(READ_CACHE_MAX_BYTES)
+
+def cached_rows(table):
+    """All rows of a table, served from the shared read cache when unchanged."""
+    return get_table_cache().rows(table, get_storage())
+
+def invalidate_cache(table):
+    """Drops a table from the shared read cache after a write."""
+    get_table_cache().invalidate(table)
+
+def read_users():
+    """Reads all user accounts."""
+    return cached_rows("users")
+        
+def add_community_post(username, region, content, attachment_filename=""):
+    """Adds a new community post, now including an attachment."""
+    row = {
+        "id": str(uuid.uuid4()),
+        "username": username,
+        "region": region,
+        "content": content,
+        "created_at": datetime.utcnow().isoformat(),
+        "votes": "0",
+        "attachment": attachment_filename,
+    }
+    with get_search_index().tracking_write("posts") as search:
+        get_storage().insert("posts", row)
+        search.add("posts", row)
+    invalidate_cache("posts")
+
+def read_community_posts():
+    """Reads all community posts."""
+    return cached_rows("posts")
+
+# -------------------------
+# Attachment Store (content-addressed files under UPLOAD_DIR, shared by all upload forms)
+# -------------------------
+ATTACHMENT_CHUNK_BYTES = 1 << 20 # uploads are hashed and written 1 MB at a time
+# Upload kind -> (size limit in MB, accepted extensions)
+ATTACHMENT_RULES = {
+    "complaint": (10, (".jpg", ".png", ".pdf")),
+    "post": (5, (".jpg", ".png")),
+    "announcement": (10, (".jpg", ".png", ".pdf")),
+}
+ATTACHMENT_ALIASES = {".jpeg": ".jpg"}
+# Extension -> leading bytes every such file starts with
+ATTACHMENT_SIGNATURES = {".jpg": b"\xff\xd8\xff", ".png": b"\x89PNG\r\n\x1a\n", ".pdf": b"%PDF-"}
+
+class AttachmentError(ValueError):
+    """A rejected upload, as a catalogue key plus its params.
+
+    The store is shared by every session, so it leaves the wording to the
+    caller's t() rather than its own.
+    """
+
+    def __init__(self, key, **params):
+        super().__init__(key)
+        self.key = key
+        self.params = params
+
+class AttachmentStore:
+    """Uploads stored once per distinct content, as <sha256[:2]>/<sha256[2:4]>/<sha256><ext>.
+
+    The stored name is that relative path, so `UPLOAD_DIR / name` resolves
+    both these and the flat uuid names written before the store existed.
+    Size and type are checked on the first pass (which also hashes), so a
+    rejected or already stored upload never touches the disk.
+
+    Identical uploads share one file, so each save() takes a claim on it that
+    the caller hands back with stored() or discard(); a file is only deleted
+    once no claim is left and no row refers to it.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.incoming = directory / ".incoming" # same filesystem, so the final rename is atomic
+        self.incoming.mkdir(parents=True, exist_ok=True)
+        self.claims_dir = directory / ".claims" # <file name> -> number of unsettled save() calls
+        self.claims_dir.mkdir(exist_ok=True)
+
+    def path(self, name):
+        return self.directory / name
+
+    def claims_path(self, name):
+        return self.claims_dir / Path(name).name
+
+    def claims(self, name):
+        try:
+            return int(self.claims_path(name).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def set_claims(self, name, count):
+        path = self.claims_path(name)
+        if count <= 0:
+            path.unlink(missing_ok=True)
+            return
+        with atomic_replace(path) as tmp:
+            tmp.write_text(str(count), encoding="utf-8")
+
+    def save(self, uploaded, kind):
+        """Stores a file-like upload and returns its name; raises AttachmentError if it breaks the limits."""
+        limit_mb, extensions = ATTACHMENT_RULES[kind]
+        ext = Path(uploaded.name).suffix.lower()
+        ext = ATTACHMENT_ALIASES.get(ext, ext)
+        if ext not in extensions:
+            raise AttachmentError("attachment_wrong_type", ext=ext or "?", allowed=", ".join(e.lstrip(".").upper() for e in extensions))
+        size, digest = 0, hashlib.sha256()
+        uploaded.seek(0)
+        head = uploaded.read(len(ATTACHMENT_SIGNATURES[ext]))
+        if head != ATTACHMENT_SIGNATURES[ext]:
+            raise AttachmentError("attachment_bad_content", ext=ext.lstrip(".").upper())
+        uploaded.seek(0)
+        while chunk := uploaded.read(ATTACHMENT_CHUNK_BYTES):
+            size += len(chunk)
+            if size > limit_mb << 20:
+                raise AttachmentError("attachment_too_large", limit=limit_mb)
+            digest.update(chunk)
+        sha = digest.hexdigest()
+        name = f"{sha[:2]}/{sha[2:4]}/{sha}{ext}"
+        target = self.path(name)
+        with file_lock(self.claims_path(name)): # a concurrent discard() cannot delete it in between
+            if not target.exists():
+                tmp_path = self.incoming / f"{sha}.{uuid.uuid4().hex}"
+                try:
+                    uploaded.seek(0)
+                    with open(tmp_path, "wb") as f:
+                        while chunk := uploaded.read(ATTACHMENT_CHUNK_BYTES):
+                            f.write(chunk)
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(tmp_path, target)
+                finally:
+                    tmp_path.unlink(missing_ok=True)
+            self.set_claims(name, self.claims(name) + 1)
+        return name
+
+    def stored(self, name):
+        """Settles a save() whose file is now referenced by a stored row."""
+        with file_lock(self.claims_path(name)):
+            self.set_claims(name, self.claims(name) - 1)
+
+    def discard(self, name):
+        """Settles an abandoned save(); deletes the file if nothing else claims or refers to it."""
+        with file_lock(self.claims_path(name)):
+            left = self.claims(name) - 1
+            self.set_claims(name, left)
+            if left > 0:
+                return
+            storage = get_storage()
+            if not any(storage.find(table, attachment=name) for table in ("complaints", "posts", "announcements")):
+                self.path(name).unlink(missing_ok=True)
+
+
+@st.cache_resource
+def get_attachment_store():
+    """Process-wide attachment store."""
+    return AttachmentStore(UPLOAD_DIR)
+
+def attachment_upload_types(kind):
+    """file_uploader `type` list for an upload kind (extension aliases included)."""
+    extensions = ATTACHMENT_RULES[kind][1]
+    aliases = [alias for alias, ext in ATTACHMENT_ALIASES.items() if ext in extensions]
+    return [ext.lstrip(".") for ext in (*extensions, *aliases)]
+
+def attachment_limits_caption(kind):
+    """'Maximum file size N MB. Accepted formats: ...' for an upload kind, from ATTACHMENT_RULES."""
+    limit_mb, extensions = ATTACHMENT_RULES[kind]
+    return t("attachment_limits", limit=limit_mb, formats=", ".join(ext.lstrip(".").upper() for ext in extensions))
+
+# -------------------------
+# Image Thumbnails (resized copies of image attachments, on-disk LRU cache)
+# -------------------------
+# Feed -> thumbnail width in pixels (twice the display width, for high-DPI screens)
+THUMBNAIL_WIDTHS = {"post": 600, "announcement": 1200}
+THUMBNAIL_EXTENSIONS = (".jpg", ".jpeg", ".png")
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_MIN_BYTES = 150 * 1024 # smaller originals are served as they are
+THUMBNAIL_CACHE_MB = 200
+
+class ThumbnailCache:
+    """JPEG thumbnails in THUMBNAIL_DIR, made on first view of an image attachment.
+
+    Attachments never change under a name, so a thumbnail (named after the
+    attachment and width) never goes stale. Entries are kept in least
+    recently used order, seeded from file mtimes and refreshed with
+    os.utime on use, and the oldest are deleted past THUMBNAIL_CACHE_MB.
+    """
+
+    def __init__(self, directory, limit_bytes):
+        self.directory = directory
+        self.directory.mkdir(exist_ok=True)
+        self.limit_bytes = limit_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict() # file name -> size, oldest first
+        self.total = 0
+        found = []
+        for path in directory.glob("*.jpg"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError: # evicted by another process meanwhile
+                continue
+            found.append((stat.st_mtime, path.name, stat.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total += size
+
+    def thumbnail(self, name, width):
+        """Path to show for attachment `name` at `width`; None if it is not a readable image."""
+        source = UPLOAD_DIR / name
+        if source.suffix.lower() not in THUMBNAIL_EXTENSIONS:
+            return None
+        if source.stat().st_size <= THUMBNAIL_MIN_BYTES:
+            return source
+        key = f"{hashlib.sha1(name.encode()).hexdigest()}_{width}.jpg"
+        path = self.directory / key
+        with self.lock:
+            if key in self.entries:
+                try:
+                    os.utime(path)
+                    self.entries.move_to_end(key)
+                    return path
+                except FileNotFoundError:
+                    self.total -= self.entries.pop(key)
+        tmp_path = self.directory / f".{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            with Image.open(source) as im:
+                im.draft("RGB", (width, width)) # JPEGs decode straight at a reduced scale
+                im = ImageOps.exif_transpose(im)
+                im.thumbnail((width, width))
+                if im.mode != "RGB":
+                    rgba = im.convert("RGBA")
+                    im = Image.new("RGB", rgba.size, "white")
+                    im.paste(rgba, mask=rgba.getchannel("A"))
+                im.save(tmp_path, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+            os.replace(tmp_path, path)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            return None
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        size = path.stat().st_size
+        with self.lock:
+            self.total += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            while self.total > self.limit_bytes and len(self.entries) > 1:
+                oldest, size = self.entries.popitem(last=False)
+                (self.directory / oldest).unlink(missing_ok=True)
+                self.total -= size
+        return path
+
+
+@st.cache_resource
+def get_thumbnail_cache():
+    """Process-wide thumbnail cache."""
+    return ThumbnailCache(THUMBNAIL_DIR, THUMBNAIL_CACHE_MB << 20)
+
+# -------------------------
+# Community Board Votes (append-only ledger + in-memory tallies)
+# -------------------------
+VOTE_FLUSH_INTERVAL = 5 # seconds between tally flushes into the posts table
+
+def vote_fingerprint(post_id, username):
+    """64-bit fingerprint of a (post, user) pair for the in-memory voter set."""
+    digest = hashlib.blake2b(f"{post_id}\x1f{username}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class VoteLedger:
+    """Process-wide vote bookkeeping for the community board.
+
+    Every vote is one row in the 'votes' ledger, unique per (post_id, username),
+    so duplicate protection survives logouts and is shared by all sessions.
+    "Already voted" checks hit an in-memory set of fingerprints, and per-post
+    increments are batched and flushed into posts.votes in the background
+    instead of rewriting the posts table on every click.
+    """
+
+    def __init__(self, storage, search):
+        self.storage = storage
+        self.search = search
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock() # one flush at a time (background loop vs. atexit)
+        self.voters = {vote_fingerprint(v["post_id"], v["username"]) for v in storage.all("votes")}
+        self.pending = {}
+        self.flushing = {}
+        threading.Thread(target=self._flush_loop, name="vote-flush", daemon=True).start()
+        atexit.register(self.flush)
+
+    def has_voted(self, post_id, username):
+        return vote_fingerprint(post_id, username) in self.voters
+
+    def vote(self, post_id, username):
+        """Records a vote; returns False if this user already supported the post."""
+        fingerprint = vote_fingerprint(post_id, username)
+        if fingerprint in self.voters:
+            return False
+        with self._lock:
+            if fingerprint in self.voters:
+                return False
+            # The ledger's unique constraint also catches votes cast through other processes
+            recorded = self.storage.insert("votes", {"post_id": post_id, "username": username, "created_at": datetime.utcnow().isoformat()})
+            self.voters.add(fingerprint)
+            if recorded:
+                self.pending[post_id] = self.pending.get(post_id, 0) + 1
+        return recorded
+
+    def tally(self, post):
+        """Vote count for a post row, including increments not flushed yet."""
+        try:
+            stored = int(post.get("votes") or 0)
+        except ValueError:
+            stored = 0
+        return stored + self.pending.get(post["id"], 0) + self.flushing.get(post["id"], 0)
+
+    def flush(self):
+        """Adds the batched increments to posts.votes (one single-row update per post).
+
+        A failed update is logged and its count goes back into `pending` for the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self.pending:
+                    return
+                self.flushing, self.pending = self.pending, {}
+            for post_id, count in list(self.flushing.items()):
+                try:
+                    # Vote counts are not searchable; tracking only spares the search index a rebuild
+                    with self.search.tracking_write("posts"):
+                        self.storage.increment("posts", post_id, "votes", count)
+                except Exception:
+                    log.exception("Vote flush failed for post %s; %d vote(s) kept for the next flush", post_id, count)
+                    with self._lock:
+                        self.pending[post_id] = self.pending.get(post_id, 0) + count
+                        self.flushing.pop(post_id, None)
+                    continue
+                self.flushing.pop(post_id, None)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(VOTE_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception: # keep the thread alive; pending counts stay queued
+                log.exception("Vote flush loop error")
+
+
+@st.cache_resource
+def get_vote_ledger():
+    """Returns the process-wide VoteLedger."""
+    return VoteLedger(get_storage(), get_search_index())
+
+def update_post_votes(post_id, username):
+    """Registers one vote for a post (once per user, across sessions)."""
+    return get_vote_ledger().vote(post_id, username)
+
+def handle_vote(post_id, username):
+    """Callback function to handle voting and rerun."""
+    # Using t() for toast messages
+    if update_post_votes(post_id, username):
+        st.toast(t("Support registered successfully."))
+    else:
+        st.toast(t("You have already registered support for this discussion."))
+    st.rerun()
+
+# -------------------------
+# In-process Table Indexes (follow this process's writes to the tables they cover)
+# -------------------------
+class TableIndex:
+    """Base for process-wide structures derived from one or more tables.
+
+    Subclasses list their `tables` and implement rebuild(table). Writers in
+    this process update the index inside tracking_write(table); a storage
+    version the index did not produce (a write from another process) makes
+    the next sync() rebuild that table's part.
+    """
+    tables = ("complaints",)
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._lock = threading.RLock()
+        self.versions = {} # table -> storage version this index reflects; missing/None forces a rebuild
+
+    def rebuild(self, table):
+        raise NotImplementedError
+
+    def sync(self):
+        """Rebuilds any table that changed behind the index's back (call under the lock)."""
+        for table in self.tables:
+            version = self.storage.version(table)
+            if self.versions.get(table) != version:
+                self.rebuild(table)
+                self.versions[table] = version
+
+    def reset(self, table="complaints"):
+        """Forces a rebuild on next use (for changes the index cannot apply incrementally)."""
+        self.versions[table] = None
+
+    @contextmanager
+    def tracking_write(self, table="complaints"):
+        """Wraps a write to `table` by this process; the caller updates the index inside."""
+        with self._lock:
+            before = self.storage.version(table)
+            try:
+                yield self
+            except BaseException:
+                self.versions[table] = None
+                raise
+            after = self.storage.version(table)
+            # Another process wrote in between (or the index was never built): rebuild on next read
+            self.versions[table] = after if self.versions.get(table) == before else None
+
+
+@contextmanager
+def tracking_complaint_write():
+    """Wraps a complaint write so every in-process complaint index can follow it.
+
+    Yields the indexes as attributes: triage, clusters, search, duplicates.
+    """
+    with get_triage_queue().tracking_write() as triage, get_cluster_detector().tracking_write() as clusters, \
+            get_search_index().tracking_write() as search, get_duplicate_index().tracking_write() as duplicates:
+        yield SimpleNamespace(triage=triage, clusters=clusters, search=search, duplicates=duplicates)
+
+
+# -------------------------
+# Credentials (username index, verification cache, login throttling)
+# -------------------------
+LOGIN_WINDOW_SECONDS = 300
+# Throttle key kind -> failed logins allowed per window
+LOGIN_MAX_FAILURES = {"username": 5, "ip": 20}
+LOGIN_THROTTLE_MAX_KEYS = 10000 # past this, the keys that failed least recently are dropped
+
+class CredentialStore(TableIndex):
+    """Users keyed by username, rebuilt only when the users table changes.
+
+    A successful check remembers an HMAC of the password (under a random
+    per-process key) next to the stored hash, so repeat logins skip the KDF
+    until the hash changes. Legacy or weaker hashes are replaced with
+    hash_password() on the first successful login. Unknown usernames are
+    checked against a dummy hash so they take as long as a wrong password.
+    """
+    tables = ("users",)
+
+    def __init__(self, storage):
+        super().__init__(storage)
+        self.by_username = {}
+        self.verified = {} # username -> (stored hash, HMAC of the password that matched it)
+        self.secret = os.urandom(32)
+        self.dummy_hash = hash_password(os.urandom(16).hex())
+
+    def rebuild(self, table):
+        self.by_username = {u["username"]: u for u in self.storage.all("users")}
+
+    def verify(self, username, password):
+        """The user's row if `password` is right, else None."""
+        with self._lock:
+            self.sync()
+            user = self.by_username.get(username)
+            remembered = self.verified.get(username)
+        if user is None:
+            check_password(password, self.dummy_hash)
+            return None
+        stored = user["password_hash"]
+        token = hmac.new(self.secret, password.encode("utf-8"), "sha256").digest()
+        if remembered and remembered[0] == stored and hmac.compare_digest(remembered[1], token):
+            return user
+        if not check_password(password, stored): # the slow part, run outside the lock
+            return None
+        if password_needs_rehash(stored):
+            stored = hash_password(password)
+            with self.tracking_write("users"):
+                self.storage.update("users", user["id"], {"password_hash": stored})
+                user = self.by_username[username] = {**user, "password_hash": stored}
+            invalidate_cache("users")
+        with self._lock:
+            self.verified[username] = (stored, token)
+        return user
+
+
+@st.cache_resource
+def get_credential_store():
+    """Process-wide username index over the users table."""
+    return CredentialStore(get_storage())
+
+
+class LoginThrottle:
+    """Failed logins per username and per client IP over a sliding LOGIN_WINDOW_SECONDS.
+
+    Checked before any password hashing, so a flood of guesses is turned
+    away without spending KDF time on it. Counts are per process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.failures = OrderedDict() # (kind, value) -> deque of failure timestamps, least recent failure first
+
+    def keys(self, username, ip):
+        keys = [("username", username.lower())]
+        if ip:
+            keys.append(("ip", ip))
+        return keys
+
+    def retry_after(self, username, ip):
+        """Seconds until another attempt is allowed (0 if allowed now)."""
+        now = time.time()
+        wait = 0
+        with self.lock:
+            for key in self.keys(username, ip):
+                stamps = self.failures.get(key)
+                if not stamps:
+                    continue
+                while stamps and stamps[0] <= now - LOGIN_WINDOW_SECONDS:
+                    stamps.popleft()
+                if len(stamps) >= LOGIN_MAX_FAILURES[key[0]]:
+                    wait = max(wait, stamps[0] + LOGIN_WINDOW_SECONDS - now)
+        return math.ceil(wait)
+
+    def failed(self, username, ip):
+        now = time.time()
+        with self.lock:
+            for key in self.keys(username, ip):
+                self.failures.setdefault(key, deque()).append(now)
+                self.failures.move_to_end(key)
+            # Expired keys sit at the front, so this stops at the first live one
+            while self.failures:
+                stamps = next(iter(self.failures.values()))
+                if stamps and stamps[-1] > now - LOGIN_WINDOW_SECONDS and len(self.failures) <= LOGIN_THROTTLE_MAX_KEYS:
+                    break
+                self.failures.popitem(last=False)
+
+    def succeeded(self, username):
+        with self.lock:
+            self.failures.pop(("username", username.lower()), None)
+
+
+@st.cache_resource
+def get_login_throttle():
+    """Process-wide login throttle."""
+    return LoginThrottle()
+
+def check_credentials(username, password, area_code, ip=None): 
+    """Checks user credentials against the username index, throttling repeated failures."""
+    throttle = get_login_throttle()
+    wait = throttle.retry_after(username, ip)
+    if wait:
+        return {"error": "rate_limited", "retry_after": wait}
+    u = get_credential_store().verify(username, password)
+    if u is None:
+        throttle.failed(username, ip)
+        return None
+    throttle.succeeded(username)
+            
+    if u.get("area_code") != area_code:
+        return {"error": "area_code_mismatch"} 
+
+    if u.get("region") != TARGET_REGION:
+        return {"error": "region_mismatch"} 
+        
+    return u
+
+# -------------------------
+# Triage Queue (open complaints by priority, then time to SLA breach)
+# -------------------------
+URGENT_QUEUE_DEFAULT = 5
+
+class TriageQueue(TableIndex):
+    """Process-wide heap of open complaints, most urgent first.
+
+    Entries are ordered by (priority, SLA due time) and kept current by the
+    complaint writers instead of re-sorting the table on every rerun. Changed or
+    resolved complaints leave stale heap entries behind that are skipped (and
+    dropped) when met.
+    """
+
+    def __init__(self, storage):
+        super().__init__(storage)
+        self.entries = {}   # complaint id -> current sort key
+        self.heap = []      # (sort key, complaint id), may contain stale entries
+
+    @staticmethod
+    def sort_key(row):
+        try:
+            due = datetime.fromisoformat(row.get("sla_due") or "").timestamp()
+        except ValueError:
+            due = float("inf")
+        return (-PRIORITY_RANK.get(row.get("priority"), 0), due)
+
+    def rebuild(self, table):
+        open_rows, _ = self.storage.query("complaints", [("status", "!=", "status_resolved")])
+        self.entries = {r["id"]: self.sort_key(r) for r in open_rows}
+        self.reheap()
+
+    def reheap(self):
+        self.heap = [(key, cid) for cid, key in self.entries.items()]
+        heapq.heapify(self.heap)
+
+    def push(self, row):
+        """Files a new or reprioritised open complaint (O(log N))."""
+        key = self.sort_key(row)
+        if self.entries.get(row["id"]) == key:
+            return
+        self.entries[row["id"]] = key
+        heapq.heappush(self.heap, (key, row["id"]))
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.reheap() # Too many stale entries
+
+    def set_status(self, complaint_id, status_key):
+        """Follows a status change: resolved complaints leave the queue, reopened ones re-enter."""
+        if status_key == "status_resolved":
+            self.entries.pop(complaint_id, None)
+        elif complaint_id not in self.entries:
+            row = self.storage.get("complaints", complaint_id)
+            if row:
+                self.push(row)
+
+    def next_urgent(self, k):
+        """Ids of the k most urgent open complaints: k heap pops, pushed back afterwards."""
+        with self._lock:
+            self.sync()
+            taken = []
+            seen = set()
+            while self.heap and len(taken) < k:
+                key, cid = heapq.heappop(self.heap)
+                if self.entries.get(cid) != key or cid in seen:
+                    continue # Stale or duplicate entry, dropped for good
+                seen.add(cid)
+                taken.append((key, cid))
+            for item in taken:
+                heapq.heappush(self.heap, item)
+            return [cid for _, cid in taken]
+
+    def __len__(self):
+        return len(self.entries)
+
+
+@st.cache_resource
+def get_triage_queue():
+    """Returns the process-wide TriageQueue."""
+    return TriageQueue(get_storage())
+
+def next_urgent_complaints(k=URGENT_QUEUE_DEFAULT):
+    """The k most urgent open complaints (highest priority, nearest SLA breach first)."""
+    storage = get_storage()
+    rows = (storage.get("complaints", cid) for cid in get_triage_queue().next_urgent(k))
+    return [r for r in rows if r]
+
+# -------------------------
+# Analytics Aggregates (persisted counters, updated per complaint change)
+# -------------------------
+def stat_cells(row):
+    """The 'complaint_stats' cells one complaint contributes to: (dimension, value, status)."""
+    return [
+        ("category_status", row.get("category", ""), row.get("status", "")),
+        ("department", row.get("department", ""), ""),
+        ("priority", row.get("priority", ""), ""),
+    ]
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Map zoom level -> geohash precision (cell size roughly 1.2 km, 150 m, 40 m)
+HOTSPOT_PRECISIONS = {"Colony": 6, "Block": 7, "Street": 8}
+
+def geohash_encode(lat, lon, precision):
+    """Standard base-32 geohash of a point."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, use_lon = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if use_lon else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        use_lon = not use_lon
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = bit_count = 0
+    return "".join(chars)
+
+def geohash_center(cell):
+    """Centre point (lat, lon) of a geohash cell and its width in metres."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    use_lon = True
+    for char in cell:
+        bits = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if use_lon else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if bits >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            use_lon = not use_lon
+    width_m = (lat_range[1] - lat_range[0]) * 111_000
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2, width_m
+
+def hotspot_cells(row):
+    """The 'hotspot_cells' cells of one complaint: (precision, geohash, category, priority, status)."""
+    try:
+        lat, lon = float(row.get("latitude")), float(row.get("longitude"))
+    except (TypeError, ValueError):
+        return []
+    attrs = (row.get("category", ""), row.get("priority", ""), row.get("status", ""))
+    return [(str(p), geohash_encode(lat, lon, p), *attrs) for p in HOTSPOT_PRECISIONS.values()]
+
+# Counter table -> function giving the cells a complaint row counts towards
+COUNTER_TABLES = {
+    "complaint_stats": stat_cells,
+    "hotspot_cells": hotspot_cells,
+}
+
+def bump_counter(storage, table, cell, amount):
+    """Adds `amount` to one counter cell, creating it on first use."""
+    key = json.dumps(cell, ensure_ascii=False)
+    if storage.increment(table, key, "count", amount):
+        return
+    row = dict(zip(TABLES[table][1][1:-1], cell), key=key, count=amount)
+    if not storage.insert(table, row):
+        storage.increment(table, key, "count", amount) # Created concurrently by another writer
+
+def count_cells(rows, cells_of):
+    """Counter totals per cell over a list of complaint rows."""
+    totals = Counter()
+    for row in rows:
+        totals.update(cells_of(row))
+    return totals
+
+@st.cache_resource
+def seed_complaint_counters():
+    """Counts the existing complaints into each counter table once per installation."""
+    storage = get_storage()
+    for table, cells_of in COUNTER_TABLES.items():
+        # The sequence hands out 1 exactly once, across processes and restarts
+        if storage.next_sequence(f"{table}_seeded") == 1:
+            for cell, count in count_cells(storage.all("complaints"), cells_of).items():
+                bump_counter(storage, table, cell, count)
+    return True
+
+def recount_complaint_counters():
+    """Recounts the counter tables from the complaints table and corrects any drift; returns cells fixed.
+
+    Counters are only ever bumped, so a crash between a complaint write and its
+    bump, or writers racing across processes, leaves them off until recounted.
+    """
+    seed_complaint_counters()
+    storage = get_storage()
+    rows = storage.all("complaints")
+    fixed = 0
+    for table, cells_of in COUNTER_TABLES.items():
+        expected = {json.dumps(cell, ensure_ascii=False): (cell, count) for cell, count in count_cells(rows, cells_of).items()}
+        stored = {r["key"]: int(r.get("count") or 0) for r in storage.all(table)}
+        for key in expected.keys() | stored.keys():
+            cell, count = expected.get(key, (json.loads(key), 0))
+            if count != stored.get(key, 0):
+                bump_counter(storage, table, cell, count - stored.get(key, 0))
+                fixed += 1
+    return fixed
+
+def record_complaint_change(old, new):
+    """Moves a complaint between counter cells; `old`/`new` are None for an insert/removal."""
+    seed_complaint_counters()
+    storage = get_storage()
+    for table, cells_of in COUNTER_TABLES.items():
+        old_cells = cells_of(old) if old else []
+        new_cells = cells_of(new) if new else []
+        for cell in old_cells:
+            if cell not in new_cells:
+                bump_counter(storage, table, cell, -1)
+        for cell in new_cells:
+            if cell not in old_cells:
+                bump_counter(storage, table, cell, 1)
+
+def complaint_stats(dimension):
+    """Non-zero counters of one dimension as (value, status, count) tuples."""
+    seed_complaint_counters()
+    stats = []
+    for r in get_storage().find("complaint_stats", dimension=dimension):
+        count = int(r.get("count") or 0)
+        if count > 0:
+            stats.append((r["value"], r["status"], count))
+    return stats
+
+# Map weight of a complaint: priority rank, scaled down once it is resolved
+HOTSPOT_RESOLVED_WEIGHT = 0.2
+
+def hotspot_bins(precision, categories=None, include_resolved=False):
+    """Per-cell complaint counts and priority/status weighted scores at one geohash precision."""
+    seed_complaint_counters()
+    bins = {}
+    for r in get_storage().find("hotspot_cells", precision=str(precision)):
+        count = int(r.get("count") or 0)
+        if count <= 0 or (categories and r["category"] not in categories):
+            continue
+        resolved = r["status"] == "status_resolved"
+        if resolved and not include_resolved:
+            continue
+        weight = PRIORITY_RANK.get(r["priority"], 1) * (HOTSPOT_RESOLVED_WEIGHT if resolved else 1)
+        total = bins.setdefault(r["cell"], [0, 0.0])
+        total[0] += count
+        total[1] += count * weight
+    return bins
+
+# -------------------------
+# Offline Geocoder (gazetteer lookup, normalised addresses, memoised results)
+# -------------------------
+GAZETTEER_CSV = BASE_DIR / "gazetteer.csv"     # normalised address (block or block-plot) -> coordinates
+GEOCODE_MEMO = BASE_DIR / "geocode_memo.jsonl" # one resolved address per line, appended
+GEOCODE_LRU_SIZE = 4096
+GEOCODE_MEMO_MAX_LINES = 2 * GEOCODE_LRU_SIZE # past this, the memo file is rewritten from the LRU
+COLONY_CENTER = (12.9150, 76.6025)
+COLONY_SPREAD = 0.004 # degrees around the centre for addresses outside the gazetteer
+BLOCK_SPREAD = 0.0006 # degrees around a block centroid for plots not listed individually
+ADDRESS_FILLER_WORDS = {"HOUSE", "PLOT", "BLOCK", "FLAT", "DOOR", "NO", "NUMBER"}
+
+def normalize_address(house):
+    """Canonical form of a house/plot string, block letter first wherever it was written.
+
+    'c 81', 'C-81', 'Block C, No. 81' and '81 C Block' all give 'C-81';
+    'Flat 101, Block B' gives 'B-101' and 'D/12' gives 'D-12'.
+    """
+    words = re.split(r"[\s\-_/.,#:;()]+", house.upper())
+    parts = [part for word in words for part in re.findall(r"\d+|\D+", word)]
+    letters = [i for i, part in enumerate(parts) if len(part) == 1 and part.isalpha()]
+    # 'BLOCK X' / 'X BLOCK' names the block outright; otherwise the first lone letter is it
+    named = [i for i in letters if "BLOCK" in (parts[i - 1] if i else None, parts[i + 1] if i + 1 < len(parts) else None)]
+    block = (named or letters or [None])[0]
+    rest = [part for i, part in enumerate(parts) if i != block and part not in ADDRESS_FILLER_WORDS]
+    return "-".join(([parts[block]] if block is not None else []) + rest)
+
+def jitter(key, spread):
+    """Deterministic, independent (lat, lon) offsets within +/- spread degrees."""
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    lat_unit = int.from_bytes(digest[:4], "big") / 0xFFFFFFFF
+    lon_unit = int.from_bytes(digest[4:8], "big") / 0xFFFFFFFF
+    return (lat_unit * 2 - 1) * spread, (lon_unit * 2 - 1) * spread
+
+
+class Geocoder:
+    """Resolves house/plot strings to coordinates without any network service.
+
+    Lookups go exact address -> block centroid (plus a stable in-block offset)
+    -> an approximate point inside the colony. Results are memoised in an LRU
+    and in an append-only memo file tagged with the gazetteer version, so an
+    edited gazetteer invalidates old answers. The memo file warms the LRU at
+    start-up and is compacted down to it, so neither grows without bound.
+    """
+
+    def __init__(self, gazetteer_path, memo_path):
+        self.memo_path = memo_path
+        self._lock = threading.Lock()
+        self.gazetteer = {}
+        if gazetteer_path.exists():
+            self.version = hashlib.sha1(gazetteer_path.read_bytes()).hexdigest()[:12]
+            for row in read_csv_rows(gazetteer_path):
+                try:
+                    self.gazetteer[normalize_address(row["address"])] = (float(row["latitude"]), float(row["longitude"]))
+                except (KeyError, ValueError):
+                    continue
+        else:
+            self.version = "none"
+        self.lru = OrderedDict()
+        self.memo_lines = 0
+        if memo_path.exists():
+            with memo_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    self.memo_lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue # Torn final line
+                    if entry.get("v") == self.version:
+                        self.remember(entry["address"], (entry["lat"], entry["lon"]))
+
+    def resolve(self, address):
+        """Coordinates for a normalised address (the uncached lookup)."""
+        if address in self.gazetteer:
+            return self.gazetteer[address]
+        block = address.split("-", 1)[0]
+        if block in self.gazetteer:
+            lat, lon = self.gazetteer[block]
+            spread = BLOCK_SPREAD
+        else:
+            lat, lon = COLONY_CENTER
+            spread = COLONY_SPREAD
+        d_lat, d_lon = jitter(address, spread)
+        return round(lat + d_lat, 6), round(lon + d_lon, 6)
+
+    def remember(self, address, point):
+        self.lru[address] = point
+        self.lru.move_to_end(address)
+        if len(self.lru) > GEOCODE_LRU_SIZE:
+            self.lru.popitem(last=False)
+
+    def memo_line(self, address, point):
+        return json.dumps({"v": self.version, "address": address, "lat": point[0], "lon": point[1]}, ensure_ascii=False) + "\n"
+
+    def locate(self, house):
+        address = normalize_address(house or "")
+        with self._lock:
+            if address in self.lru:
+                self.lru.move_to_end(address)
+                return self.lru[address]
+        point = self.resolve(address)
+        with self._lock:
+            self.remember(address, point)
+            self.memo_lines += 1
+            compact = self.memo_lines > GEOCODE_MEMO_MAX_LINES
+            if compact:
+                lines = [self.memo_line(a, p) for a, p in self.lru.items()]
+                self.memo_lines = len(lines)
+        with file_lock(self.memo_path):
+            if compact:
+                with atomic_replace(self.memo_path) as tmp:
+                    tmp.write_text("".join(lines), encoding="utf-8")
+            else:
+                append_text(self.memo_path, self.memo_line(address, point))
+        return point
+
+
+@st.cache_resource
+def get_geocoder():
+    """Returns the process-wide Geocoder."""
+    return Geocoder(GAZETTEER_CSV, GEOCODE_MEMO)
+
+def geocode_house(house):
+    """(latitude, longitude) of a house/plot string."""
+    return get_geocoder().locate(house)
+
+def backfill_locations(only_missing=False):
+    """Re-geocodes stored complaints in one pass; returns how many rows changed.
+
+    Each changed row is one single-row update, and the hotspot counters follow.
+    """
+    seed_complaint_counters() # Before any update, so the one-time recount cannot count a row twice
+    storage = get_storage()
+    changed = 0
+    for row in storage.all("complaints"):
+        if only_missing and row.get("latitude") and row.get("longitude"):
+            continue
+        lat, lon = (str(v) for v in geocode_house(row.get("house", "")))
+        if (row.get("latitude"), row.get("longitude")) == (lat, lon):
+            continue
+        with tracking_complaint_write() as indexes:
+            updated = storage.update("complaints", row["id"], {"latitude": lat, "longitude": lon})
+            # Moved points are re-clustered and re-scoped from scratch
+            indexes.clusters.reset()
+            indexes.duplicates.reset()
+        if updated:
+            record_complaint_change(row, {**row, "latitude": lat, "longitude": lon})
+            changed += 1
+    if changed:
+        invalidate_cache("complaints")
+    return changed
+
+# -------------------------
+# Hotspot Clusters (incremental density clustering of recent complaints)
+# -------------------------
+# Complaints of one category within radius_m metres and window_hours of each
+# other are neighbours; a complaint with at least min_points - 1 neighbours is a
+# core point, and core points chain their neighbours into one cluster (DBSCAN).
+CLUSTER_RULES = [
+    {"category": "Water Supply", "radius_m": 100, "window_hours": 48, "min_points": 3},
+    {"category": "Security", "radius_m": 150, "window_hours": 24 * 14, "min_points": 3},
+    {"category": "Sanitation", "radius_m": 100, "window_hours": 72, "min_points": 4},
+    {"category": "Electricity/Power", "radius_m": 200, "window_hours": 24, "min_points": 3},
+]
+CLUSTER_LOOKBACK_DAYS = 30 # only complaints filed this recently are clustered
+METRES_PER_DEGREE = 111_320
+
+
+class DensityGrid:
+    """Points of one cluster rule in a uniform grid of radius-sized cells.
+
+    A neighbour query only scans the 3x3 cells around a point, so adding a
+    complaint costs O(local density) instead of a pass over all points.
+    Core points are joined in a union-find that only ever merges; a border
+    point belongs to the cluster of the first core point that reached it, so
+    it never bridges two clusters (DBSCAN semantics).
+    """
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.window = rule["window_hours"] * 3600
+        self.cell_lat = rule["radius_m"] / METRES_PER_DEGREE
+        # Longitude degrees shrink with latitude; the colony spans too little for this to vary
+        self.lon_scale = math.cos(math.radians(COLONY_CENTER[0]))
+        self.cell_lon = self.cell_lat / self.lon_scale
+        self.cells = {}      # (row, col) -> [complaint id]
+        self.points = {}     # complaint id -> (lat, lon, timestamp)
+        self.degree = {}     # complaint id -> number of neighbours
+        self.parent = {}     # union-find over core points
+        self.attached = {}   # border complaint id -> the core point it belongs to
+
+    def cell(self, lat, lon):
+        return int(lat // self.cell_lat), int(lon // self.cell_lon)
+
+    def near(self, lat, lon, ts):
+        row, col = self.cell(lat, lon)
+        radius = self.rule["radius_m"]
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                for cid in self.cells.get((row + d_row, col + d_col), ()):
+                    q_lat, q_lon, q_ts = self.points[cid]
+                    if abs(q_ts - ts) > self.window:
+                        continue
+                    distance = math.hypot(q_lat - lat, (q_lon - lon) * self.lon_scale) * METRES_PER_DEGREE
+                    if distance <= radius:
+                        yield cid
+
+    def find(self, cid):
+        root = cid
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[cid] != root:
+            self.parent[cid], cid = root, self.parent[cid]
+        return root
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+    def is_core(self, cid):
+        return self.degree[cid] >= self.rule["min_points"] - 1
+
+    def turn_core(self, cid, neighbours):
+        """Joins a new core point with its core neighbours and claims its unclaimed border ones."""
+        self.attached.pop(cid, None)
+        core_degree = self.rule["min_points"] - 1
+        for q in neighbours:
+            if q == cid:
+                continue
+            if self.degree[q] >= core_degree:
+                self.union(cid, q)
+            else:
+                self.attached.setdefault(q, cid)
+
+    def add(self, cid, lat, lon, ts):
+        """Adds a point; work is one neighbour query plus one more per point that turns core."""
+        found = list(self.near(lat, lon, ts))
+        self.points[cid] = (lat, lon, ts)
+        self.cells.setdefault(self.cell(lat, lon), []).append(cid)
+        self.parent[cid] = cid
+        self.degree[cid] = len(found)
+        core_degree = self.rule["min_points"] - 1
+        new_core = len(found) >= core_degree
+        if new_core: # the new point is core: its neighbourhood joins it
+            self.turn_core(cid, found)
+        for q in found:
+            self.degree[q] += 1
+            if self.degree[q] == core_degree: # q just turned core: link its whole neighbourhood once
+                q_lat, q_lon, q_ts = self.points[q]
+                self.turn_core(q, self.near(q_lat, q_lon, q_ts))
+            elif self.degree[q] > core_degree and not new_core: # q was core already: the new border point is reachable from it
+                self.attached.setdefault(cid, q)
+
+    def clusters(self):
+        groups = {}
+        for cid in self.points:
+            if self.is_core(cid):
+                root = self.find(cid)
+            elif cid in self.attached:
+                root = self.find(self.attached[cid])
+            else:
+                continue # noise
+            groups.setdefault(root, []).append(cid)
+        return list(groups.values())
+
+
+class ClusterDetector(TableIndex):
+    """Process-wide density clusters over recent complaints, one grid per rule."""
+
+    def __init__(self, storage):
+        super().__init__(storage)
+        self.grids = {}
+        self.cutoff = 0.0
+
+    def rebuild(self, table):
+        self.grids = {rule["category"]: DensityGrid(rule) for rule in CLUSTER_RULES}
+        since = datetime.utcnow() - timedelta(days=CLUSTER_LOOKBACK_DAYS)
+        self.cutoff = since.timestamp()
+        rows, _ = self.storage.query("complaints", [("created_at", ">=", since.isoformat())], [("created_at", False, None)])
+        for row in rows:
+            self.add(row)
+
+    def add(self, row):
+        """Adds a newly filed complaint (no-op without a rule for its category or a location)."""
+        grid = self.grids.get(row.get("category"))
+        if grid is None:
+            return
+        try:
+            lat, lon = float(row["latitude"]), float(row["longitude"])
+            ts = datetime.fromisoformat(row["created_at"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return
+        grid.add(row["id"], lat, lon, ts)
+
+    def clusters(self):
+        """Detected clusters, largest first."""
+        with self._lock:
+            # Drop complaints that aged out of the lookback window (at most one rebuild a day)
+            if self.cutoff < (datetime.utcnow() - timedelta(days=CLUSTER_LOOKBACK_DAYS + 1)).timestamp():
+                self.reset()
+            self.sync()
+            found = []
+            for category, grid in self.grids.items():
+                for ids in grid.clusters():
+                    points = [grid.points[cid] for cid in ids]
+                    found.append({
+                        "category": category,
+                        "ids": sorted(ids, key=lambda cid: grid.points[cid][2]),
+                        "size": len(ids),
+                        "latitude": sum(p[0] for p in points) / len(points),
+                        "longitude": sum(p[1] for p in points) / len(points),
+                        "first": datetime.fromtimestamp(min(p[2] for p in points)).isoformat(timespec="minutes"),
+                        "last": datetime.fromtimestamp(max(p[2] for p in points)).isoformat(timespec="minutes"),
+                        "radius_m": grid.rule["radius_m"],
+                        "window_hours": grid.rule["window_hours"],
+                    })
+            return sorted(found, key=lambda c: -c["size"])
+
+
+@st.cache_resource
+def get_cluster_detector():
+    """Returns the process-wide ClusterDetector."""
+    return ClusterDetector(get_storage())
+
+def detected_clusters():
+    """Current hotspot clusters (see CLUSTER_RULES)."""
+    return get_cluster_detector().clusters()
+
+def describe_cluster(cluster):
+    """One-line alert text for a cluster."""
+    return f"{cluster['size']} × {t(cluster['category'])} — {t('within')} {cluster['radius_m']} m / {cluster['window_hours']} {t('hrs')} ({cluster['first'].replace('T', ' ')} → {cluster['last'].replace('T', ' ')})"
+
+# -------------------------
+# Near-duplicate Detection (MinHash signatures, LSH buckets over open complaints)
+# -------------------------
+MINHASH_SIZE = 64
+LSH_BANDS = 16 # 16 bands of 4 rows: pairs around 0.5 Jaccard or more share a bucket with high probability
+DUPLICATE_THRESHOLD = 0.5 # estimated Jaccard similarity of the descriptions' shingles
+DUPLICATE_SCOPE_PRECISION = 6 # geohash cell (~1.2 km) a duplicate must share, besides the category
+DUPLICATE_MAX_RESULTS = 3
+MINHASH_PRIME = (1 << 31) - 1
+_minhash_rng = np.random.RandomState(7) # fixed seed: signatures must be stable across restarts
+MINHASH_A = _minhash_rng.randint(1, MINHASH_PRIME, MINHASH_SIZE).astype(np.uint64)
+MINHASH_B = _minhash_rng.randint(0, MINHASH_PRIME, MINHASH_SIZE).astype(np.uint64)
+
+def shingles(text):
+    """Character 3-grams of the normalised text (robust to typos and word order)."""
+    text = " ".join(tokenize(text))
+    if len(text) < 3:
+        return {text}
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def minhash(text):
+    """MINHASH_SIZE-value signature; equal positions estimate the Jaccard similarity."""
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big") & MINHASH_PRIME for s in shingles(text)),
+        dtype=np.uint64,
+    )
+    return ((MINHASH_A[:, None] * hashes[None, :] + MINHASH_B[:, None]) % MINHASH_PRIME).min(axis=1)
+
+
+class DuplicateIndex(TableIndex):
+    """LSH index of open complaints for near-duplicate lookups at submission.
+
+    Signatures are cut into LSH_BANDS bands; a band plus the complaint's
+    scope (category and location cell) is a bucket key, so a lookup only
+    compares against complaints sharing at least one bucket.
     """
-    desc_lower = description.lower()
-    
-    # Keywords for severity detection 
-    emergency_keywords = ['fire', 'leak', 'danger', 'injury', 'collapse', 'immediate', 'life threatening', 'emergency']
-    high_keywords = ['urgent', 'major break', 'no power', 'blockage', 'broken', 'hazard', 'severe', 'critical']
-    
-    # High-risk categories
-    high_risk_categories = ["Security", "Water Supply", "Electricity/Power", "Infrastructure/Roads"] 
-    
-    # Priority strings must match the keys used in the t() function's dictionary for consistency
-    priority_key = "priority_standard"
-    sla_days = 7 # Default SLA (7 days)
 
-    # 1. Check for Emergency Priority (1 day / 24 hours)
-    if any(k in category for k in high_risk_categories) and any(keyword in desc_lower for keyword in emergency_keywords):
-        priority_key = "priority_emergency"
-        sla_days = 1 
-    
-    # 2. Check for High Priority (3 days)
-    elif any(k in category for k in high_risk_categories) or any(keyword in desc_lower for keyword in high_keywords):
-        priority_key = "priority_high"
-        sla_days = 3
-    
-    # 3. Default to Standard Priority (7 days)
-    
-    # Calculate SLA due date
-    sla_due_date = datetime.utcnow() + timedelta(days=sla_days)
-    
-    return priority_key, sla_due_date.isoformat() # Return the KEY
+    def __init__(self, storage):
+        super().__init__(storage)
+        self.signatures = {} # complaint id -> (scope, signature)
+        self.buckets = {}    # (scope, band, band bytes) -> set of complaint ids
 
-def hash_password(plain: str) -> str:
-    return hashlib.sha256(plain.encode("utf-8")).hexdigest()
+    @staticmethod
+    def scope(category, lat, lon):
+        try:
+            cell = geohash_encode(float(lat), float(lon), DUPLICATE_SCOPE_PRECISION)
+        except (TypeError, ValueError):
+            cell = ""
+        return category, cell
 
-def ensure_files_exist():
-    """Checks for required CSV files and ensures they have the correct headers and initial data."""
-    COMPLAINT_HEADER = ["id","username","name","house","category","description","attachment","created_at","status","department","admin_notes","latitude","longitude","sla_due","priority"]
-    USER_HEADER = ["id","username","password_hash","is_admin","region","area_code"] 
-    POST_HEADER = ["id","username","region","content","created_at", "votes", "attachment"] 
-    FEEDBACK_HEADER = ["complaint_id", "username", "rating", "suggestion", "created_at"] 
-    ANNOUNCEMENT_HEADER = ["id","author","content","created_at", "attachment"] 
+    @staticmethod
+    def band_keys(scope, signature):
+        rows = MINHASH_SIZE // LSH_BANDS
+        return [(scope, band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(LSH_BANDS)]
 
-    # 1. USERS_CSV Setup
-    if not USERS_CSV.exists() or len(list(csv.reader(USERS_CSV.open("r", newline="", encoding="utf-8")))) <= 1:
-        with USERS_CSV.open("w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(USER_HEADER)
-            w.writerow([str(uuid.uuid4()), "admin", hash_password("password"), "1", TARGET_REGION, "9000"]) 
-            w.writerow([str(uuid.uuid4()), "resident", hash_password("password"), "0", TARGET_REGION, "1234"])
-            w.writerow([str(uuid.uuid4()), "neighbor", hash_password("pass123"), "0", TARGET_REGION, "5678"]) 
-            w.writerow([str(uuid.uuid4()), "outsider", hash_password("test"), "0", "Riverwood Heights", "9999"])
-            
-    # 2. COMPLAINTS_CSV Setup 
-    if not COMPLAINTS_CSV.exists():
-        with COMPLAINTS_CSV.open("w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(COMPLAINT_HEADER)
-            
-    # 3. ANNOUNCEMENTS_CSV Setup
-    if not ANNOUNCEMENTS_CSV.exists():
-        with ANNOUNCEMENTS_CSV.open("w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(ANNOUNCEMENT_HEADER)
-            
-    # 4. POSTS_CSV Setup and Migration 
-    if not POSTS_CSV.exists():
-        with POSTS_CSV.open("w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(POST_HEADER)
-            
-    # 5. FEEDBACK_CSV Setup
-    if not FEEDBACK_CSV.exists():
-        with FEEDBACK_CSV.open("w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(FEEDBACK_HEADER)
-            
-ensure_files_exist()
+    def rebuild(self, table):
+        self.signatures, self.buckets = {}, {}
+        open_rows, _ = self.storage.query("complaints", [("status", "!=", "status_resolved")])
+        for row in open_rows:
+            self.add(row)
 
-def read_users():
-    with USERS_CSV.open("r", newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
-        
-def check_credentials(username, password, area_code): 
-    """Checks user credentials against the CSV file."""
-    for u in read_users():
-        if (u["username"] == username and 
-            u["password_hash"] == hash_password(password)):
-            
-            if u.get("area_code") != area_code:
-                return {"error": "area_code_mismatch"} 
+    def add(self, row):
+        """Indexes an open complaint."""
+        if row.get("status") == "status_resolved":
+            return
+        scope = self.scope(row.get("category", ""), row.get("latitude"), row.get("longitude"))
+        signature = minhash(row.get("description", ""))
+        self.signatures[row["id"]] = (scope, signature)
+        for key in self.band_keys(scope, signature):
+            self.buckets.setdefault(key, set()).add(row["id"])
 
-            if u.get("region") != TARGET_REGION:
-                return {"error": "region_mismatch"} 
-                
-            return u
-    return None
-    
-def add_community_post(username, region, content, attachment_filename=""):
-    """Adds a new community post to the CSV, now including an attachment."""
-    with POSTS_CSV.open("a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        # Includes the new attachment field
-        w.writerow([str(uuid.uuid4()), username, region, content, datetime.utcnow().isoformat(), "0", attachment_filename])
+    def remove(self, complaint_id):
+        entry = self.signatures.pop(complaint_id, None)
+        if entry is None:
+            return
+        for key in self.band_keys(*entry):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(complaint_id)
+                if not bucket:
+                    del self.buckets[key]
 
-def read_community_posts():
-    """Reads all community posts."""
-    with POSTS_CSV.open("r", newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+    def set_status(self, complaint_id, status_key):
+        """Resolved complaints stop counting as duplicates; reopened ones count again."""
+        if status_key == "status_resolved":
+            self.remove(complaint_id)
+        elif complaint_id not in self.signatures:
+            row = self.storage.get("complaints", complaint_id)
+            if row:
+                self.add(row)
 
-def update_post_votes(post_id, username):
-    # ... [Voting logic remains identical] ...
-    rows = []
-    updated = False
-    POST_HEADER = ["id","username","region","content","created_at", "votes", "attachment"]
-    
-    if "voted_posts" not in st.session_state:
-        st.session_state.voted_posts = {}
-        
-    if post_id in st.session_state.voted_posts.get(username, []):
-        return False
-        
-    with POSTS_CSV.open("r", newline="", encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            if row["id"] == post_id:
-                try:
-                    current_votes = int(row.get("votes", 0))
-                    row["votes"] = str(current_votes + 1)
-                    updated = True
-                except ValueError:
-                    row["votes"] = "1"
-                    updated = True
-                    
-            rows.append(row)
-            
-    if updated:
-        with POSTS_CSV.open("w", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(f, fieldnames=POST_HEADER)
-            w.writeheader()
-            w.writerows(rows)
-            
-        if username not in st.session_state.voted_posts:
-            st.session_state.voted_posts[username] = []
-        st.session_state.voted_posts[username].append(post_id)
-        
-    return updated
+    def similar(self, category, lat, lon, description, limit=DUPLICATE_MAX_RESULTS):
+        """(complaint id, estimated similarity) of likely duplicates, most similar first."""
+        scope = self.scope(category, lat, lon)
+        signature = minhash(description)
+        with self._lock:
+            self.sync()
+            candidates = set()
+            for key in self.band_keys(scope, signature):
+                candidates |= self.buckets.get(key, set())
+            scored = [(cid, float(np.mean(self.signatures[cid][1] == signature))) for cid in candidates]
+        matches = [(cid, score) for cid, score in scored if score >= DUPLICATE_THRESHOLD]
+        return sorted(matches, key=lambda m: -m[1])[:limit]
 
-def handle_vote(post_id, username):
-    """Callback function to handle voting and rerun."""
-    # Using t() for toast messages
-    if update_post_votes(post_id, username):
-        st.toast(t("Support registered successfully."))
-    else:
-        st.toast(t("You have already registered support for this discussion in this session."))
-    st.rerun()
 
-def get_dummy_location(house_details):
-    # ... [Location logic remains identical] ...
-    base_lat = 12.9150 
-    base_lon = 76.6025
-    
-    hash_val = int(hashlib.sha1(house_details.encode('utf-8')).hexdigest(), 16)
-    
-    lat_offset = (hash_val % 1000) / 100000.0 - 0.005 
-    lon_offset = (hash_val % 1000) / 100000.0 - 0.005
-    
-    return base_lat + lat_offset, base_lon + lon_offset
+@st.cache_resource
+def get_duplicate_index():
+    """Returns the process-wide DuplicateIndex."""
+    return DuplicateIndex(get_storage())
+
+def find_duplicate_complaints(category, house, description):
+    """Open complaints that look like the same issue: (row, similarity) pairs, most similar first."""
+    lat, lon = geocode_house(house)
+    storage = get_storage()
+    found = []
+    for cid, score in get_duplicate_index().similar(category, lat, lon, description):
+        row = storage.get("complaints", cid)
+        if row:
+            found.append((row, score))
+    return found
 
 def list_complaints():
     """Reads all complaint records."""
-    with COMPLAINTS_CSV.open("r", newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+    return cached_rows("complaints")
 
-def get_next_complaint_id():
-    # ... [ID generation logic remains identical] ...
-    complaints = list_complaints()
+def count_complaints():
+    """Number of complaint records, without reading them."""
+    return get_storage().count("complaints")
+
+def max_numeric_complaint_id():
+    """Largest purely numeric complaint id on file (seeds the id sequence once)."""
     max_id = 0
     
-    for c in complaints:
-        try:
-            if c.get("id") and c["id"].isdigit():
-                max_id = max(max_id, int(c["id"]))
-        except ValueError:
-            continue
+    for c in list_complaints():
+        if c.get("id") and c["id"].isdigit():
+            max_id = max(max_id, int(c["id"]))
             
-    return str(max_id + 1)
+    return max_id
+
+@st.cache_resource
+def legacy_complaint_ids():
+    """Numeric complaint ids on file when this process first allocates (read once).
+
+    Ids handed out by the sequence never collide with each other, so only rows
+    written outside it (before the sequence existed, or by older code) can clash.
+    """
+    return frozenset(c["id"] for c in list_complaints() if c.get("id", "").isdigit())
+
+def allocate_complaint_ids(count=1):
+    """Reserves a block of `count` complaint ids in one step (e.g. for bulk imports).
+
+    Ids come from a persisted sequence, so allocation is O(1) and safe across
+    sessions and processes. Values already taken by legacy rows are skipped.
+    """
+    storage = get_storage()
+    taken = legacy_complaint_ids()
+    ids = []
+    while len(ids) < count:
+        needed = count - len(ids)
+        start = storage.next_sequence("complaint_id", needed, seed=max_numeric_complaint_id)
+        ids.extend(str(n) for n in range(start, start + needed) if str(n) not in taken)
+    return ids
+
+def list_user_complaints(username, page=1, page_size=10):
+    """One page of a resident's complaints (newest first) and their total count.
+
+    Served by the username index, so the cost depends on the resident's own
+    history rather than on the size of the whole complaints table.
+    """
+    return get_storage().page("complaints", "username", username, page_size, (page - 1) * page_size)
+
+def query_complaints(status=None, priority=None, department=None, overdue=False, page=1, page_size=25):
+    """One page of the admin queue (Emergency first, then newest) and the total match count.
+
+    Filters are applied by the storage engine, so only the requested page is loaded.
+    """
+    where = []
+    if status:
+        where.append(("status", "=", status))
+    if priority:
+        where.append(("priority", "=", priority))
+    if department is not None:
+        where.append(("department", "=", department))
+    if overdue:
+        where += [("status", "!=", "status_resolved"), ("sla_due", "!=", ""), ("sla_due", "<", datetime.utcnow().isoformat())]
+    order = [("priority", True, PRIORITY_RANK), ("created_at", True, None)]
+    return get_storage().query("complaints", where, order, page_size, (page - 1) * page_size)
+
+def get_next_complaint_id():
+    """Returns the next free complaint id."""
+    return allocate_complaint_ids(1)[0]
 
-def add_complaint(username, name, house, category, description, attachment_filename):
+def add_complaint(username, name, house, category, description, attachment_filename, duplicate_of=""):
     """Adds a new complaint record, now storing the priority KEY."""
     new_id = get_next_complaint_id() 
-    lat, lon = get_dummy_location(house)
+    lat, lon = geocode_house(house)
     
     # Store the priority KEY (e.g., 'priority_high') 
     priority_key, sla_due = determine_priority_and_sla(category, description)
@@ -454,110 +2584,369 @@ def add_complaint(username, name, house, category, description, attachment_filen
     # Store the STATUS KEY (e.g., 'status_open') 
     status_key = "status_open"
     
-    COMPLAINT_HEADER = ["id","username","name","house","category","description","attachment","created_at","status","department","admin_notes","latitude","longitude","sla_due","priority"]
-    with COMPLAINTS_CSV.open("a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow([
-            new_id, 
-            username, 
-            name, 
-            house, 
-            category, 
-            description, 
-            attachment_filename, 
-            datetime.utcnow().isoformat(), 
-            status_key, # Store KEY
-            "", 
-            "", 
-            lat, 
-            lon, 
-            sla_due,    
-            priority_key    # Store KEY
-        ])
+    row = {
+        "id": new_id,
+        "username": username,
+        "name": name,
+        "house": house,
+        "category": category,
+        "description": description,
+        "attachment": attachment_filename,
+        "created_at": datetime.utcnow().isoformat(),
+        "status": status_key, # Store KEY
+        "department": "",
+        "admin_notes": "",
+        "latitude": lat,
+        "longitude": lon,
+        "sla_due": sla_due,
+        "priority": priority_key, # Store KEY
+        "duplicate_of": duplicate_of, # ids the resident was warned about, for the admin view only
+    }
+    seed_complaint_counters() # Before the insert, so the one-time recount cannot include it twice
+    with tracking_complaint_write() as indexes:
+        get_storage().insert("complaints", row)
+        indexes.triage.push(row)
+        indexes.clusters.add(row)
+        indexes.search.add("complaints", row)
+        indexes.duplicates.add(row)
+    record_complaint_change(None, row)
+    invalidate_cache("complaints")
 
 # Function remains the same, but values stored/retrieved are keys
 def update_complaint_status(complaint_id, new_status_key, department=None, admin_notes=None):
     """Updates the status (key), department, and notes for a complaint."""
-    rows = []
-    updated = False
-    COMPLAINT_HEADER = ["id","username","name","house","category","description","attachment","created_at","status","department","admin_notes","latitude","longitude","sla_due","priority"]
-    with COMPLAINTS_CSV.open("r", newline="", encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            if row["id"] == complaint_id:
-                row["status"] = new_status_key # new_status_key is now the English key
-                if department is not None:
-                    row["department"] = department
-                if admin_notes is not None:
-                    row["admin_notes"] = admin_notes
-                updated = True
-            rows.append(row)
-    if updated:
-        with COMPLAINTS_CSV.open("w", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(f, fieldnames=COMPLAINT_HEADER)
-            w.writeheader()
-            w.writerows(rows)
+    changes = {"status": new_status_key} # new_status_key is now the English key
+    if department is not None:
+        changes["department"] = department
+    if admin_notes is not None:
+        changes["admin_notes"] = admin_notes
+    seed_complaint_counters()
+    storage = get_storage()
+    with tracking_complaint_write() as indexes:
+        old = storage.get("complaints", complaint_id)
+        updated = storage.update("complaints", complaint_id, changes)
+        if updated:
+            indexes.triage.set_status(complaint_id, new_status_key)
+            indexes.duplicates.set_status(complaint_id, new_status_key)
+            if old:
+                indexes.search.add("complaints", {**old, **changes})
+    if updated and old:
+        record_complaint_change(old, {**old, **changes})
+    invalidate_cache("complaints")
     return updated
 
+def reclassify_complaints():
+    """Re-applies the priority rules to every stored complaint; returns how many changed.
+
+    Classification is one batch pass over the table; only rows whose priority
+    changes are written, with the SLA recomputed from their filing time.
+    """
+    seed_complaint_counters()
+    storage = get_storage()
+    rows = storage.all("complaints")
+    if not rows:
+        return 0
+    priorities, sla_days = get_priority_classifier().classify_batch(
+        [r.get("category", "") for r in rows], [r.get("description", "") for r in rows]
+    )
+    changed = 0
+    for row, priority_key, days in zip(rows, priorities, sla_days):
+        if row.get("priority") == priority_key:
+            continue
+        try:
+            sla_due = (datetime.fromisoformat(row["created_at"]) + timedelta(days=int(days))).isoformat()
+        except (KeyError, ValueError):
+            sla_due = row.get("sla_due", "")
+        changes = {"priority": priority_key, "sla_due": sla_due}
+        with tracking_complaint_write() as indexes:
+            updated = storage.update("complaints", row["id"], changes)
+            if updated and row.get("status") != "status_resolved":
+                indexes.triage.push({**row, **changes})
+        if updated:
+            record_complaint_change(row, {**row, **changes})
+            changed += 1
+    if changed:
+        invalidate_cache("complaints")
+    return changed
+
+def export_tables_to_csv():
+    """Writes every table of the SQLite engine to its legacy CSV file; returns rows written per table."""
+    storage = get_storage()
+    written = {}
+    for table, (csv_path, _, _) in TABLES.items():
+        with file_lock(csv_path):
+            written[table] = storage.export_csv(table, csv_path)
+    return written
+
+def import_tables_from_csv():
+    """Adds rows found in the legacy CSV files but missing from the SQLite engine; returns rows added per table.
+
+    The counter tables are derived from complaints and are not imported.
+    """
+    storage = get_storage()
+    added = {}
+    for table in TABLES:
+        if table in COUNTER_TABLES:
+            continue
+        added[table] = storage.import_csv(table)
+        if added[table]:
+            invalidate_cache(table)
+    if added.get("complaints"):
+        legacy_complaint_ids.clear() # imported ids must not be handed out again
+        recount_complaint_counters()
+    return added
+
 def read_announcements():
     """Reads all announcements."""
-    with ANNOUNCEMENTS_CSV.open("r", newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+    return cached_rows("announcements")
         
 def add_announcement(author, content, attachment_filename=""):
     """Adds a new announcement, including optional attachment."""
-    ANNOUNCEMENT_HEADER = ["id","author","content","created_at", "attachment"] 
-    with ANNOUNCEMENTS_CSV.open("a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow([str(uuid.uuid4()), author, content, datetime.utcnow().isoformat(), attachment_filename])
+    row = {
+        "id": str(uuid.uuid4()),
+        "author": author,
+        "content": content,
+        "created_at": datetime.utcnow().isoformat(),
+        "attachment": attachment_filename,
+    }
+    with get_search_index().tracking_write("announcements") as search:
+        get_storage().insert("announcements", row)
+        search.add("announcements", row)
+    invalidate_cache("announcements")
 
 def read_feedback():
     """Reads all citizen feedback."""
-    if not FEEDBACK_CSV.exists():
-        return []
-    with FEEDBACK_CSV.open("r", newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+    return cached_rows("feedback")
 
 def add_feedback(complaint_id, username, rating, suggestion):
-    """Adds a new feedback record for a resolved complaint."""
-    with FEEDBACK_CSV.open("a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow([complaint_id, username, rating, suggestion, datetime.utcnow().isoformat()])
+    """Adds a new feedback record for a resolved complaint.
 
-    return True
+    Returns False if this user already rated the complaint (unique on complaint_id + username).
+    """
+    added = get_storage().insert("feedback", {
+        "complaint_id": complaint_id,
+        "username": username,
+        "rating": rating,
+        "suggestion": suggestion,
+        "created_at": datetime.utcnow().isoformat(),
+    })
+    invalidate_cache("feedback")
+    return added
     
-def has_user_given_feedback(complaint_id):
-    """Checks if the current user has already submitted feedback for a specific complaint."""
-    all_feedback = read_feedback()
-    return any(f.get('complaint_id') == complaint_id and f.get('username') == st.session_state.user["username"] for f in all_feedback)
+def feedback_given_for(username, complaint_ids):
+    """Returns which of `complaint_ids` the user has already rated, in one indexed lookup."""
+    wanted = set(complaint_ids)
+    if not wanted:
+        return set()
+    return {f["complaint_id"] for f in get_storage().find("feedback", username=username) if f["complaint_id"] in wanted}
 
-@st.cache_data
-def complaints_to_excel(data):
-    """Generates an Excel file from the complaint data."""
-    df = pd.DataFrame(data)
-    
-    # Translate status and priority keys back to English for the Excel export
-    df['status'] = df['status'].apply(lambda x: TRANSLATIONS['en'].get(x, x))
-    df['priority'] = df['priority'].apply(lambda x: TRANSLATIONS['en'].get(x, x))
-    
-    COLUMNS_ORDER = [
-        "id", "created_at", "username", "name", "house", 
-        "category", "priority", "description", "status", "department", 
-        "admin_notes", "attachment", "latitude", "longitude", "sla_due"
-    ]
-    
-    for col in COLUMNS_ORDER:
-        if col not in df.columns:
-            df[col] = ""
+# -------------------------
+# Data Export (streamed writers, cached per data version)
+# -------------------------
+EXPORT_COLUMNS = [
+    "id", "created_at", "username", "name", "house", 
+    "category", "priority", "description", "status", "department", 
+    "admin_notes", "duplicate_of", "attachment", "latitude", "longitude", "sla_due"
+]
+EXPORT_BATCH_ROWS = 5000 # rows per Parquet record batch / progress report
 
-    df = df[COLUMNS_ORDER]
-    
-    output = BytesIO()
-    
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Complaints_Data', index=False)
-    
-    return output.getvalue()
+# Format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("csv", "text/csv"),
+}
+if pa is not None:
+    EXPORT_FORMATS["parquet"] = ("parquet", "application/vnd.apache.parquet")
+
+def export_records(rows, progress=None):
+    """Yields complaint rows as value lists in EXPORT_COLUMNS order, with status/priority in English.
+
+    `progress`, if given, is called with the number of rows produced so far.
+    """
+    english = get_catalogue().messages("en")
+    for count, row in enumerate(rows, 1):
+        values = [row.get(col, "") for col in EXPORT_COLUMNS]
+        values[6] = english.get(values[6], values[6])
+        values[8] = english.get(values[8], values[8])
+        yield values
+        if progress is not None and count % EXPORT_BATCH_ROWS == 0:
+            progress(count)
+
+def write_export(rows, fmt, out, progress=None):
+    """Streams complaint rows into the binary file `out` without building a DataFrame."""
+    records = export_records(rows, progress)
+    if fmt == "xlsx":
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Complaints_Data")
+        sheet.append(EXPORT_COLUMNS)
+        for values in records:
+            sheet.append(values)
+        workbook.save(out)
+    elif fmt == "csv":
+        text = TextIOWrapper(out, encoding="utf-8-sig", newline="")
+        writer = csv.writer(text)
+        writer.writerow(EXPORT_COLUMNS)
+        writer.writerows(records)
+        text.detach() # Leave `out` open for the caller
+    elif fmt == "parquet" and pa is not None:
+        schema = pa.schema([(col, pa.string()) for col in EXPORT_COLUMNS])
+        with pq.ParquetWriter(out, schema) as writer:
+            batch = []
+            for values in records:
+                batch.append([str(v) for v in values])
+                if len(batch) >= EXPORT_BATCH_ROWS:
+                    writer.write_batch(pa.RecordBatch.from_arrays([pa.array(c, pa.string()) for c in zip(*batch)], schema=schema))
+                    batch = []
+            if batch:
+                writer.write_batch(pa.RecordBatch.from_arrays([pa.array(c, pa.string()) for c in zip(*batch)], schema=schema))
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+
+class ExportCache:
+    """Process-wide cache of the full complaints export, one file per format.
+
+    Entries are keyed on the storage version() token, so a download is built
+    once per data change and reused by every admin rerun and session. Builds
+    run outside the lock, which only guards looking up and publishing entries.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = {} # format -> (version, bytes)
+        self.builds = 0
+
+    def get(self, fmt, storage):
+        version = storage.version("complaints") # Taken before the read so a concurrent write forces a rebuild
+        with self._lock:
+            entry = self.entries.get(fmt)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        out = BytesIO()
+        write_export(cached_rows("complaints"), fmt, out)
+        data = out.getvalue()
+        with self._lock:
+            self.entries[fmt] = (version, data)
+            self.builds += 1
+        return data
+
+
+@st.cache_resource
+def get_export_cache():
+    """Returns the process-wide ExportCache."""
+    return ExportCache()
+
+def complaints_export(fmt="xlsx"):
+    """The full complaints export in `fmt`, rebuilt only after the complaints table changes."""
+    return get_export_cache().get(fmt, get_storage())
+
+def filtered_complaints(date_from=None, date_to=None, status=None, department=None):
+    """Complaints filed between two dates (inclusive), optionally by status/department, newest first."""
+    where = []
+    if date_from:
+        where.append(("created_at", ">=", date_from.isoformat()))
+    if date_to:
+        where.append(("created_at", "<", (date_to + timedelta(days=1)).isoformat()))
+    if status:
+        where.append(("status", "=", status))
+    if department is not None:
+        where.append(("department", "=", department))
+    return get_storage().query("complaints", where, [("created_at", True, None)])[0]
+
+EXPORT_WORKERS = 2
+EXPORT_JOBS_KEPT = 20 # older finished jobs and their files are dropped
+EXPORT_JOB_MAX_AGE = timedelta(hours=24) # finished jobs older than this are dropped, and so are older files on disk
+
+class ExportJobs:
+    """Process-wide background export queue.
+
+    Filtered exports run on a small thread pool and write their file into
+    EXPORT_DIR, so the admin UI never blocks on a large workbook. Jobs report
+    rows written so far and stay listed (with their file) until they age out.
+    Job records live in memory only, so files left behind by earlier runs are
+    swept once they are older than EXPORT_JOB_MAX_AGE.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+        self.jobs = OrderedDict() # job id -> job dict
+        self.sweep_files()
+
+    @staticmethod
+    def sweep_files():
+        """Deletes export files (and interrupted temp files) older than EXPORT_JOB_MAX_AGE."""
+        cutoff = time.time() - EXPORT_JOB_MAX_AGE.total_seconds()
+        for path in EXPORT_DIR.glob("*Grievance_Export_*"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except FileNotFoundError: # removed by another process
+                pass
+
+    def submit(self, owner, fmt, filters):
+        """Queues a filtered export; returns the job id."""
+        job = {
+            "id": uuid.uuid4().hex[:8].upper(),
+            "owner": owner,
+            "format": fmt,
+            "filters": filters,
+            "state": "queued",
+            "rows": 0,
+            "written": 0,
+            "created_at": datetime.utcnow().isoformat(),
+            "path": None,
+            "error": "",
+        }
+        with self._lock:
+            self.jobs[job["id"]] = job
+            self._prune()
+        self.sweep_files()
+        self.pool.submit(self._run, job)
+        return job["id"]
+
+    def _run(self, job):
+        try:
+            job["state"] = "running"
+            rows = filtered_complaints(**job["filters"])
+            job["rows"] = len(rows)
+            EXPORT_DIR.mkdir(exist_ok=True)
+            extension, _ = EXPORT_FORMATS[job["format"]]
+            path = EXPORT_DIR / f"Grievance_Export_{job['id']}.{extension}"
+            with atomic_replace(path) as tmp:
+                with open(tmp, "wb") as out:
+                    write_export(rows, job["format"], out, progress=lambda n: job.update(written=n))
+            job.update(written=len(rows), path=path, state="done")
+        except Exception as exc:
+            job.update(state="failed", error=str(exc))
+
+    def _prune(self):
+        cutoff = (datetime.utcnow() - EXPORT_JOB_MAX_AGE).isoformat()
+        expired = [jid for jid, j in self.jobs.items() if j["state"] in ("done", "failed") and j["created_at"] < cutoff]
+        for jid in expired:
+            self._drop(jid)
+        while len(self.jobs) > EXPORT_JOBS_KEPT:
+            oldest = next((jid for jid, j in self.jobs.items() if j["state"] in ("done", "failed")), None)
+            if oldest is None:
+                return
+            self._drop(oldest)
+
+    def _drop(self, jid):
+        old = self.jobs.pop(jid)
+        if old["path"]:
+            Path(old["path"]).unlink(missing_ok=True)
+
+    def list(self):
+        """Snapshots of all kept jobs, newest first."""
+        with self._lock:
+            self._prune()
+            return [dict(job) for job in reversed(self.jobs.values())]
+
+
+@st.cache_resource
+def get_export_jobs():
+    """Returns the process-wide ExportJobs queue."""
+    return ExportJobs()
 
 
 # -------------------------
@@ -568,9 +2957,6 @@ st.set_page_config(page_title=t("system_title"), page_icon="🏛️", layout="wi
 if "user" not in st.session_state:
     st.session_state.user = None
 
-if "voted_posts" not in st.session_state:
-    st.session_state.voted_posts = {}
-
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
     
@@ -595,12 +2981,14 @@ def do_login():
             password = st.text_input(t("password"), type="password", key="login_password", placeholder=t("password"))
             
             if st.form_submit_button(t("authenticate_button"), type="primary"):
-                user_check = check_credentials(username.strip(), password, area_code.strip()) 
+                user_check = check_credentials(username.strip(), password, area_code.strip(), st.context.ip_address) 
                 
                 if user_check is None:
                     st.error(t("Invalid Username or Password."))
+                elif isinstance(user_check, dict) and user_check.get("error") == "rate_limited":
+                    st.error(t("login_rate_limited", minutes=math.ceil(user_check["retry_after"] / 60)))
                 elif isinstance(user_check, dict) and user_check.get("error") == "region_mismatch":
-                    st.error(t(f"Access Denied: This portal is exclusively for residents of **{TARGET_REGION}**."))
+                    st.error(t("login_region_denied"))
                 elif isinstance(user_check, dict) and user_check.get("error") == "area_code_mismatch":
                     st.error(t("Access Denied: The provided Area Code is incorrect for this user account."))
                 else:
@@ -608,7 +2996,7 @@ def do_login():
                          del user_check['points']
                          
                     st.session_state.user = user_check
-                    st.success(t(f"Authentication successful, {st.session_state.user['username']}. Redirecting to service dashboard."))
+                    st.success(t("login_success", username=st.session_state.user['username']))
                     st.rerun()
         st.markdown("---")
         st.caption(t("credential_admin")) 
@@ -618,7 +3006,6 @@ def do_login():
 def do_logout():
     st.session_state.user = None
     st.session_state.chat_history = []
-    st.session_state.voted_posts = {}
     st.session_state.show_profile_sidebar = False 
     st.success(t("Session terminated. You have been logged out successfully."))
     st.rerun()
@@ -673,41 +3060,276 @@ def user_profile_sidebar():
 # -------------------------
 # Chatbot Logic - Updated to use t()
 # -------------------------
-def chatbot_response(user_input):
-    """Provides canned responses to guide the user through the portal. Logic remains English."""
+ASSISTANT_INTENTS_JSON = BASE_DIR / "assistant_intents.json" # intents, keywords and replies, tried in file order
+ASSISTANT_MAX_RESULTS = 3
+TOKEN_PATTERN = re.compile(r"[\w\u0C80-\u0CFF]+") # Kannada vowel signs are not \w on their own
+
+def tokenize(text):
+    """Lower-cased word tokens (Kannada words kept whole)."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+PREFIX_MATCH_WEIGHT = 0.5 # score factor of a prefix hit ('94ae' -> '94ae76fb') relative to an exact one
+PREFIX_EXPANSIONS = 50    # vocabulary words a single prefix may expand to
+PREFIX_MIN_LENGTH = 2     # single characters ('c' in 'c 81') only match exactly
+
+class InvertedIndex:
+    """Token -> {document id: term count} postings with tf-idf ranked lookups.
+
+    A sorted vocabulary is kept alongside, so prefix lookups are a bisect
+    instead of a scan over every token.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.docs = {} # document id -> tokens, for removal
+        self.vocabulary = []
+
+    def add(self, doc_id, text):
+        self.remove(doc_id)
+        tokens = tokenize(text)
+        self.docs[doc_id] = tokens
+        for token in tokens:
+            bucket = self.postings.get(token)
+            if bucket is None:
+                bucket = self.postings[token] = {}
+                bisect.insort(self.vocabulary, token)
+            bucket[doc_id] = bucket.get(doc_id, 0) + 1
+
+    def remove(self, doc_id):
+        for token in set(self.docs.pop(doc_id, ())):
+            bucket = self.postings.get(token)
+            if bucket is not None:
+                bucket.pop(doc_id, None)
+                if not bucket:
+                    del self.postings[token]
+                    del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+
+    def expand(self, prefix):
+        """Vocabulary words starting with `prefix` (at most PREFIX_EXPANSIONS)."""
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        words = []
+        for word in self.vocabulary[start:start + PREFIX_EXPANSIONS]:
+            if not word.startswith(prefix):
+                break
+            words.append(word)
+        return words
+
+    def search(self, terms, limit=None, prefix=False):
+        """Ids of documents containing any of `terms`, best first (ties keep insertion order).
+
+        With `prefix`, a term also matches longer words it starts, at a lower weight.
+        """
+        scores = {}
+        total = len(self.docs) or 1
+        for term in set(terms):
+            matches = [(term, 1.0)]
+            if prefix and len(term) >= PREFIX_MIN_LENGTH:
+                matches += [(word, PREFIX_MATCH_WEIGHT) for word in self.expand(term) if word != term]
+            for word, weight in matches:
+                bucket = self.postings.get(word)
+                if not bucket:
+                    continue
+                idf = math.log(1 + total / len(bucket))
+                for doc_id, count in bucket.items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + count * idf * weight
+        if limit:
+            return heapq.nlargest(limit, scores, key=scores.get)
+        return sorted(scores, key=scores.get, reverse=True)
+
+
+class IntentEngine:
+    """Assistant intents from ASSISTANT_INTENTS_JSON compiled into one regex.
+
+    Like the priority classifier, every intent is an optional lookahead with a
+    named group, so one match() finds all intents present and the first one in
+    file order wins. The file's "order" note records why emergency, status and
+    announcements come ahead of the greeting and grievance intents.
+    """
+
+    def __init__(self, path):
+        spec = json.loads(Path(path).read_text(encoding="utf-8"))
+        self.intents = spec["intents"]
+        self.fallback = spec["fallback"]
+        self.stopwords = set(spec["stopwords"])
+        self.keyword_tokens = {token for intent in self.intents for k in intent["keywords"] for token in tokenize(k)}
+        groups = []
+        for i, intent in enumerate(self.intents):
+            alternatives = "|".join(re.escape(k.lower()) for k in sorted(intent["keywords"], key=len, reverse=True))
+            # Word boundaries spelled out, since \b splits Kannada words at their vowel signs
+            body = rf"(?<![\w\u0C80-\u0CFF])(?:{alternatives})(?![\w\u0C80-\u0CFF])" if intent.get("whole_word") else f"(?:{alternatives})"
+            groups.append(f"(?=[\\s\\S]*?(?P<intent{i}>{body}))?")
+        self.matcher = re.compile("".join(groups))
+
+    def match(self, text):
+        """The first intent (in file order) whose keywords occur in the lower-cased text."""
+        found = self.matcher.match(text)
+        return next((intent for i, intent in enumerate(self.intents) if found.group(f"intent{i}") is not None), None)
+
+    def content_terms(self, text):
+        """Query tokens that are neither stopwords nor intent keywords."""
+        return [token for token in tokenize(text) if token not in self.stopwords and token not in self.keyword_tokens]
+
+
+@st.cache_resource(max_entries=1)
+def load_intent_engine(intents_mtime):
+    """Compiles the intents file once per version (`intents_mtime` is the cache key)."""
+    return IntentEngine(ASSISTANT_INTENTS_JSON)
+
+def get_intent_engine():
+    """The compiled intent engine, reloaded when the intents file changes on disk."""
+    return load_intent_engine(ASSISTANT_INTENTS_JSON.stat().st_mtime_ns)
+
+@st.cache_resource(max_entries=1)
+def announcement_index(version):
+    """Inverted index over all announcements, newest first (`version` is the cache key)."""
+    rows = sorted(get_storage().all("announcements"), key=lambda a: a.get("created_at", ""), reverse=True)
+    index = InvertedIndex()
+    for a in rows:
+        index.add(a["id"], a.get("content", ""))
+    return index, {a["id"]: a for a in rows}
+
+@st.cache_resource(max_entries=256)
+def user_complaint_index(username, version):
+    """Inverted index over one resident's complaints, newest first (`version` is the cache key)."""
+    rows = sorted(get_storage().find("complaints", username=username), key=lambda c: c.get("created_at", ""), reverse=True)
+    english, kannada = get_catalogue().messages("en"), get_catalogue().messages("kn")
+    index = InvertedIndex()
+    for c in rows:
+        fields = [c["id"], c.get("house", ""), c.get("category", ""), c.get("description", ""), c.get("department", ""), english.get(c.get("status", ""), "")]
+        fields += [kannada.get(c.get("category", ""), ""), kannada.get(c.get("status", ""), "")]
+        index.add(c["id"], " ".join(fields))
+    return index, {c["id"]: c for c in rows}
+
+
+class TranslatedKeys(dict):
+    """format_map() helper: '{tab_status_tracking}' becomes t('tab_status_tracking')."""
+
+    def __missing__(self, key):
+        return t(key)
+
+
+def answer_from_complaints(username, terms):
+    """Markdown lines about the resident's complaints matching `terms` (newest ones if no terms)."""
+    index, rows = user_complaint_index(username, get_storage().version("complaints"))
+    if not rows:
+        return ""
+    ids = index.search(terms, ASSISTANT_MAX_RESULTS) if terms else list(rows)[:ASSISTANT_MAX_RESULTS]
+    if not ids:
+        return t("assistant_no_matching_complaint")
+    lines = [
+        f"- **{cid}** · {t(rows[cid].get('category', ''))} · {t(rows[cid].get('status', 'status_open'))} · "
+        f"{rows[cid].get('department') or t('Not Yet Assigned')} · {rows[cid].get('created_at', '')[:10]}"
+        for cid in ids
+    ]
+    return t("assistant_found_complaints") + "\n" + "\n".join(lines)
+
+def answer_from_announcements(terms):
+    """Markdown snippets of the announcements matching `terms` (the latest one if no terms)."""
+    index, rows = announcement_index(get_storage().version("announcements"))
+    if not rows:
+        return ""
+    ids = index.search(terms, ASSISTANT_MAX_RESULTS) if terms else list(rows)[:1]
+    lines = []
+    for aid in ids:
+        content = rows[aid].get("content", "")
+        snippet = content if len(content) <= 160 else content[:157] + "..."
+        lines.append(f"- 📢 {rows[aid].get('created_at', '')[:10]}: {snippet}")
+    return "\n".join(lines)
+
+def chatbot_response(user_input, username=None):
+    """Answers from the resident's data where an intent has a lookup, else with the intent's guidance text."""
     text = user_input.lower().strip()
+    engine = get_intent_engine()
+    intent = engine.match(text)
+    if intent is None:
+        return t(engine.fallback)
     
-    # Responses use t()
-    if re.search(r'\b(hello|hi|hey|greetings|start|ನಮಸ್ಕಾರ|ಶುಭಾಶಯ)\b', text):
-        return t("welcome_message")
+    # Responses use t(); {key} placeholders become translated tab names
+    reply = t(intent["response"]).format_map(TranslatedKeys())
     
-    if re.search(r'\b(grievance|report|issue|problem|complaint|ಕುಂದುಕೊರತೆ|ಸಮಸ್ಯೆ|ವರದಿ)\b', text):
-        return t(f"To file a new grievance, please use the **{t('tab_raise_grievance')}** section. You can monitor the progress of your existing grievances in **{t('tab_status_tracking')}**.")
-    
-    if re.search(r'\b(status|track|pending|resolved|progress|ಸ್ಥಿತಿ|ಟ್ರ್ಯಾಕ್|ಪ್ರಗತಿ)\b', text):
-        return t(f"You can check the current status and resolution details for all your reported issues under the **{t('tab_status_tracking')}** section.")
+    found = ""
+    if intent.get("lookup") == "complaints" and username:
+        found = answer_from_complaints(username, engine.content_terms(text))
+    elif intent.get("lookup") == "announcements":
+        found = answer_from_announcements(engine.content_terms(text))
+    return f"{found}\n\n{reply}" if found else reply
+
+# -------------------------
+# Full-text Search (complaints, community posts and announcements)
+# -------------------------
+SEARCH_MAX_RESULTS = 20
 
-    if re.search(r'\b(notice|announcement|news|circular|ಪ್ರಕಟಣೆ|ಸುದ್ದಿ)\b', text):
-        return t(f"Official notifications and circulars from the administration are posted in the **{t('tab_announcements')}** section. Kindly check there for the latest information.")
+def search_text(table, row):
+    """Searchable text of a row; categories and statuses are indexed in English and Kannada."""
+    english, kannada = get_catalogue().messages("en"), get_catalogue().messages("kn")
+    if table == "complaints":
+        category, status = row.get("category", ""), row.get("status", "")
+        fields = [row.get("id", ""), row.get("username", ""), row.get("name", ""), row.get("house", ""),
+                  category, kannada.get(category, ""), row.get("description", ""), row.get("department", ""),
+                  row.get("admin_notes", ""), english.get(status, ""), kannada.get(status, "")]
+    elif table == "posts":
+        fields = [row.get("id", ""), row.get("username", ""), row.get("region", ""), row.get("content", "")]
+    else:
+        fields = [row.get("id", ""), row.get("author", ""), row.get("content", "")]
+    return " ".join(str(f) for f in fields)
 
-    if re.search(r'\b(post|community|talk|discussion|neighbor|ಸಮುದಾಯ|ಚರ್ಚೆ)\b', text):
-        return t(f"For community discussions and neighborhood updates, please navigate to the **{t('tab_community')}** tab.")
-        
-    if re.search(r'\b(admin|contact|official|department|ಆಡಳಿತ|ಸಂಪರ್ಕ)\b', text):
-        return t("Direct departmental contact information is not provided here. Please file a grievance, and the relevant department will process it via the **Admin Grievance Management** system.")
-        
-    if re.search(r'emergency|life threatening|ತುರ್ತು|ಜೀವಕ್ಕೆ ಅಪಾಯ', text):
-        return t("If this is a **life-threatening emergency**, please contact local emergency services immediately (e.g., Police, Fire, Ambulance). Our digital grievance system will automatically assign **Emergency** priority to your complaint.")
 
-    if re.search(r'\b(feedback|suggestion|rate|improve|satisfaction|ಪ್ರತಿಕ್ರಿಯೆ|ಸಲಹೆ)\b', text):
-        return t("We request your valuable feedback on resolved grievances. This can be submitted via the **Grievance Status Tracking** tab after a case is marked 'Resolved'.")
+class SearchIndex(TableIndex):
+    """Process-wide inverted index over complaints, posts and announcements.
+
+    Writers add rows as they store them, so a query only touches the postings
+    of its own terms. Document ids are (table, row id) pairs.
+    """
+    tables = ("complaints", "posts", "announcements")
+
+    def __init__(self, storage):
+        super().__init__(storage)
+        self.index = InvertedIndex()
+        self.members = {table: set() for table in self.tables}
 
-    return t("I am unable to process that specific request. Please rephrase your query or refer to the main navigation tabs for specific services.")
+    def rebuild(self, table):
+        for row_id in self.members[table]:
+            self.index.remove((table, row_id))
+        self.members[table] = set()
+        for row in self.storage.all(table):
+            self.add(table, row)
+
+    def add(self, table, row):
+        """Indexes a new row, or re-indexes a changed one."""
+        row_id = row[TABLES[table][2]]
+        self.index.add((table, row_id), search_text(table, row))
+        self.members[table].add(row_id)
+
+    def search(self, query, limit=SEARCH_MAX_RESULTS):
+        """(table, row id) pairs matching the query's words or word prefixes, best first."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            self.sync()
+            return self.index.search(terms, limit, prefix=True)
+
+
+@st.cache_resource
+def get_search_index():
+    """Returns the process-wide SearchIndex."""
+    return SearchIndex(get_storage())
+
+def search_portal(query, limit=SEARCH_MAX_RESULTS):
+    """Ranked (table, row) results for an admin search query."""
+    storage = get_storage()
+    results = []
+    for table, row_id in get_search_index().search(query, limit):
+        row = storage.get(table, row_id)
+        if row:
+            results.append((table, row))
+    return results
 
 # UPDATED: Chatbot UI
 def chatbot_ui():
     st.markdown(f"## {t('tab_assistant')}")
-    st.info(t(f"This assistant provides guidance on navigating the public services available on the {t('region_name')} portal."))
+    st.info(t("assistant_intro"))
 
     chat_container = st.container()
     with chat_container:
@@ -718,7 +3340,8 @@ def chatbot_ui():
     
     if user_input:
         st.session_state.chat_history.append(("user", user_input))
-        bot_response_text = chatbot_response(user_input)
+        username = st.session_state.user["username"] if st.session_state.user else None
+        bot_response_text = chatbot_response(user_input, username)
         st.session_state.chat_history.append(("assistant", bot_response_text))
         st.rerun()
 
@@ -743,10 +3366,10 @@ def community_post_ui(current_user):
             
             uploaded_file = st.file_uploader(
                 t("post_image_upload"), 
-                type=["jpg", "png", "jpeg"], 
+                type=attachment_upload_types("post"), 
                 key="post_file"
             )
-            st.caption(t("Maximum file size 5MB. Only image files supported for community posts."))
+            st.caption(f"{attachment_limits_caption('post')} {t('Only image files supported for community posts.')}")
             
             button_label = t("post_as_admin") if is_admin_user else t("post_as_citizen")
             
@@ -757,28 +3380,29 @@ def community_post_ui(current_user):
                 
                 attachment_name = ""
                 if uploaded_file:
-                    ext = Path(uploaded_file.name).suffix
-                    attachment_name = f"post_{uuid.uuid4()}{ext}"
-                    with open(UPLOAD_DIR / attachment_name, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
+                    try:
+                        attachment_name = get_attachment_store().save(uploaded_file, "post")
+                    except AttachmentError as e:
+                        st.error(t(e.key, **e.params))
+                        return
                         
                 user_region = current_user.get("region", TARGET_REGION)
                 add_community_post(current_user["username"], user_region, post_content.strip(), attachment_name) 
+                if attachment_name:
+                    get_attachment_store().stored(attachment_name)
                 st.success(t("post_success"))
                 st.rerun()
                 
     
     st.markdown("---")
-    st.subheader(t("community_discussions").format(t("region_name")))
+    st.subheader(t("community_discussions"))
     posts = read_community_posts()
     current_user_region = current_user.get("region", TARGET_REGION)
     community_posts = [p for p in posts if p.get("region") == current_user_region]
     
-    # Sorting logic remains the same
-    try:
-        community_posts.sort(key=lambda x: (int(x.get("votes", 0)), x.get("created_at")), reverse=True)
-    except ValueError:
-        community_posts.sort(key=lambda x: x.get("created_at"), reverse=True)
+    # Tallies include votes not yet flushed to the posts table
+    vote_ledger = get_vote_ledger()
+    community_posts.sort(key=lambda x: (vote_ledger.tally(x), x.get("created_at")), reverse=True)
 
     if not community_posts:
         st.info(t("no_discussions"))
@@ -786,7 +3410,7 @@ def community_post_ui(current_user):
         
     for p in community_posts:
         post_id = p['id']
-        votes = int(p.get('votes', 0))
+        votes = vote_ledger.tally(p)
         attachment_filename = p.get('attachment')
         post_author = p['username']
         
@@ -818,7 +3442,10 @@ def community_post_ui(current_user):
                 if attachment_filename:
                     file_path = UPLOAD_DIR / attachment_filename
                     if file_path.exists():
-                        st.image(str(file_path), caption=t("Attached Photo"), use_column_width=False, width=300)
+                        preview = get_thumbnail_cache().thumbnail(attachment_filename, THUMBNAIL_WIDTHS["post"]) or file_path
+                        st.image(str(preview), caption=t("Attached Photo"), use_column_width=False, width=300)
+                        if preview != file_path and st.toggle(t("Show original photo"), key=f"post_original_{post_id}"):
+                            st.image(str(file_path))
             
                 created_at_str = p["created_at"]
                 try:
@@ -852,6 +3479,31 @@ def complaint_form_ui(current_user):
     """UI for submitting a new complaint."""
     st.markdown(f"## {t('file_grievance_title')}")
     st.info(t("file_grievance_info"))
+
+    # --- LIKELY DUPLICATE: the last submission waits here until the resident decides ---
+    pending = st.session_state.get("pending_complaint")
+    if pending:
+        st.warning(t("This looks like a grievance that is already open. Please check it before filing the same issue again:"))
+        for row, score in pending["duplicates"]:
+            st.markdown(f"- **{row['id']}** · {t(row.get('category', ''))} · {t(row.get('status', 'status_open'))} · {row.get('house', '')} · {row.get('created_at', '')[:10]} ({score:.0%} {t('similar')})  \n  _{row.get('description', '')[:160]}_")
+        col_file, col_discard = st.columns(2)
+        with col_file:
+            if st.button(t("File as a new grievance anyway"), key="pending_file_btn", use_container_width=True):
+                linked = ", ".join(row["id"] for row, _ in pending["duplicates"])
+                add_complaint(**pending["submission"], duplicate_of=linked)
+                if pending["submission"]["attachment_filename"]:
+                    get_attachment_store().stored(pending["submission"]["attachment_filename"])
+                del st.session_state.pending_complaint
+                st.success(t("Grievance formally submitted. Please check 'Grievance Status Tracking' for updates."))
+                st.rerun()
+        with col_discard:
+            if st.button(t("Discard, I will follow the existing grievance"), key="pending_discard_btn", use_container_width=True):
+                if pending["submission"]["attachment_filename"]:
+                    get_attachment_store().discard(pending["submission"]["attachment_filename"])
+                del st.session_state.pending_complaint
+                st.rerun()
+        return
+
     with st.form("complaint_form", clear_on_submit=True):
         
         name = st.text_input(t("name_input"), 
@@ -890,8 +3542,8 @@ def complaint_form_ui(current_user):
         st.markdown("---")
         
         st.subheader(t("attachment_header"))
-        file = st.file_uploader(t("attachment_upload"), type=["jpg", "png", "jpeg", "pdf"], key="complaint_file")
-        st.caption(t("Maximum file size 5MB. Location details should be explicitly mentioned in the description if not embedded in the file."))
+        file = st.file_uploader(t("attachment_upload"), type=attachment_upload_types("complaint"), key="complaint_file")
+        st.caption(f"{attachment_limits_caption('complaint')} {t('Location details should be explicitly mentioned in the description if not embedded in the file.')}")
         st.markdown("---")
         
         submitted = st.form_submit_button(t("submit_grievance"), type="primary", use_container_width=True)
@@ -901,30 +3553,60 @@ def complaint_form_ui(current_user):
                 return
             attachment_name = ""
             if file:
-                ext = Path(file.name).suffix
-                attachment_name = f"{uuid.uuid4()}{ext}"
-                with open(UPLOAD_DIR / attachment_name, "wb") as f:
-                    f.write(file.getbuffer())
+                try:
+                    attachment_name = get_attachment_store().save(file, "complaint")
+                except AttachmentError as e:
+                    st.error(t(e.key, **e.params))
+                    return
             
             # Use the English key (category_key) for storage
-            add_complaint(current_user["username"], name, house, category_key, description, attachment_name)
+            submission = dict(username=current_user["username"], name=name, house=house, category=category_key, description=description, attachment_filename=attachment_name)
+            duplicates = find_duplicate_complaints(category_key, house, description)
+            if duplicates:
+                st.session_state.pending_complaint = {"submission": submission, "duplicates": duplicates}
+                st.rerun()
+            add_complaint(**submission)
+            if attachment_name:
+                get_attachment_store().stored(attachment_name)
             st.success(t("Grievance formally submitted. Please check 'Grievance Status Tracking' for updates."))
             st.rerun()
 
 
+MY_COMPLAINTS_PAGE_SIZE = 10
+ADMIN_QUEUE_PAGE_SIZES = [10, 25, 50, 100]
+
 def my_complaints_ui(current_user):
     """UI for citizens to track their complaints and submit feedback."""
     st.markdown(f"## {t('tab_status_tracking')}")
-    data = list_complaints()
-    user_data = [d for d in data if d["username"] == current_user["username"]]
+    if "my_complaints_page" not in st.session_state:
+        st.session_state.my_complaints_page = 1
+    page = st.session_state.my_complaints_page
+    user_data, total = list_user_complaints(current_user["username"], page, MY_COMPLAINTS_PAGE_SIZE)
     
-    if not user_data:
+    if not total:
         st.info(t("no_grievances"))
         return
+
+    page_count = -(-total // MY_COMPLAINTS_PAGE_SIZE)
+    if page > page_count:
+        page = st.session_state.my_complaints_page = page_count
+        user_data, total = list_user_complaints(current_user["username"], page, MY_COMPLAINTS_PAGE_SIZE)
+    if page_count > 1:
+        col_page, col_caption = st.columns([1, 3])
+        with col_page:
+            st.number_input(t("Page"), min_value=1, max_value=page_count, step=1, key="my_complaints_page")
+        with col_caption:
+            st.caption(f"{t('Page')} {page} / {page_count} | {t('Total Grievances')}: {total}")
         
     st.markdown("---")
 
-    for c in user_data[::-1]:
+    # Feedback flags for every resolved ticket on this page, fetched once per render
+    rated_ids = feedback_given_for(
+        current_user["username"],
+        [c['id'] for c in user_data if c.get('status') == 'status_resolved'],
+    )
+
+    for c in user_data:
         # Status and Priority keys are retrieved from CSV
         status_key = c.get('status', 'status_open')
         department = c.get('department', t('Not Yet Assigned'))
@@ -996,7 +3678,7 @@ def my_complaints_ui(current_user):
             # --- CONDITIONAL FEEDBACK FORM ---
             if status_key == 'status_resolved':
                 st.markdown("---")
-                if not has_user_given_feedback(complaint_id):
+                if complaint_id not in rated_ids:
                     st.subheader(t("feedback_survey"))
                     st.info(t("feedback_info"))
 
@@ -1058,12 +3740,16 @@ def announcements_ui():
                     
                     ext = file_path.suffix.lower()
                     if ext in [".jpg", ".jpeg", ".png"]:
-                        st.image(str(file_path), caption=t("Attached Image/Notice"), use_column_width=True)
+                        preview = get_thumbnail_cache().thumbnail(attachment_filename, THUMBNAIL_WIDTHS["announcement"]) or file_path
+                        st.image(str(preview), caption=t("Attached Image/Notice"), use_column_width=True)
+                        if preview != file_path and st.toggle(t("Show original image"), key=f"ann_original_{a['id']}"):
+                            st.image(str(file_path))
                     else:
                         st.download_button(
-                            label=t(f"Download Attached Document ({ext.upper()})"),
-                            data=file_path.read_bytes(),
-                            file_name=attachment_filename,
+                            label=t("download_attachment", ext=ext.upper()),
+                            data=file_path.read_bytes, # Read only when clicked
+                            file_name=file_path.name,
+                            on_click="ignore",
                             key=f"ann_download_{a['id']}",
                             help=t("Download official circular document.")
                         )
@@ -1092,9 +3778,9 @@ def admin_post_announcement_ui(current_user):
         text = st.text_area(t("admin_content_label") + " (Max 500 characters)", max_chars=500, key="admin_announcement_text", placeholder=t("admin_content_placeholder"))
         
         file = st.file_uploader(t("Upload Supporting Image/Document (Optional)"), 
-                                 type=["jpg", "png", "jpeg", "pdf"], 
+                                 type=attachment_upload_types("announcement"), 
                                  key="announcement_file")
-        st.caption(t("Acceptable formats: JPG, PNG, PDF. One attachment per announcement."))
+        st.caption(f"{attachment_limits_caption('announcement')} {t('One attachment per announcement.')}")
         st.markdown("---")
         
         if st.form_submit_button(t("admin_publish_button"), type="primary"):
@@ -1104,12 +3790,15 @@ def admin_post_announcement_ui(current_user):
                 
             attachment_name = ""
             if file:
-                ext = Path(file.name).suffix
-                attachment_name = f"{uuid.uuid4()}{ext}"
-                with open(UPLOAD_DIR / attachment_name, "wb") as f:
-                    f.write(file.getbuffer())
+                try:
+                    attachment_name = get_attachment_store().save(file, "announcement")
+                except AttachmentError as e:
+                    st.error(t(e.key, **e.params))
+                    return
                     
             add_announcement(current_user["username"], text.strip(), attachment_name)
+            if attachment_name:
+                get_attachment_store().stored(attachment_name)
             st.success(t("Official Announcement published successfully to the portal."))
             st.rerun()
             
@@ -1120,66 +3809,139 @@ def admin_post_announcement_ui(current_user):
 
 
 def admin_hotspot_map_ui():
-    """Admin UI for Complaint Map Hotspots."""
+    """Admin UI for Complaint Map Hotspots (one weighted point per geohash cell)."""
     st.markdown(f"## {t('admin_tab_map')}: Geographic Incident Mapping")
     
-    data = list_complaints()
-    if not data:
+    if not complaint_stats("priority"):
         st.info(t("No recorded grievances to display on the geographic map."))
         return
 
-    df = pd.DataFrame(data)
-    
-    df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
-    df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
-    
     st.markdown(f"### {t('Visualization of Active and Pending Grievance Locations')}")
-    map_data = df.dropna(subset=['latitude', 'longitude'])
+
+    filter_cols = st.columns([1, 2, 1])
+    with filter_cols[0]:
+        zoom_level = st.selectbox(t("Map Detail"), list(HOTSPOT_PRECISIONS), index=1, format_func=t, key="hotspot_zoom")
+    with filter_cols[1]:
+        categories = st.multiselect(t("Category"), sorted({v for v, _, _ in complaint_stats("category_status")}), format_func=t, key="hotspot_categories")
+    with filter_cols[2]:
+        include_resolved = st.checkbox(t("Include resolved"), key="hotspot_include_resolved")
+
+    bins = hotspot_bins(HOTSPOT_PRECISIONS[zoom_level], categories, include_resolved)
+    points = []
+    heaviest = max((score for _, score in bins.values()), default=0) or 1
+    for cell, (count, score) in bins.items():
+        lat, lon, width_m = geohash_center(cell)
+        # Circle area proportional to the weighted score, the heaviest cell spans half its width
+        points.append({"latitude": lat, "longitude": lon, "size": width_m / 2 * (score / heaviest) ** 0.5, "count": count, "color": "#0077b6"})
+    clusters = [c for c in detected_clusters() if not categories or c["category"] in categories]
     
-    if not map_data.empty:
-        st.map(map_data, 
+    if points:
+        cluster_points = [{"latitude": c["latitude"], "longitude": c["longitude"], "size": c["radius_m"], "count": 0, "color": "#d6282880"} for c in clusters]
+        st.map(pd.DataFrame(points + cluster_points), 
                 latitude='latitude', 
                 longitude='longitude', 
-                size='id', 
-                color='#0077b6',
+                size='size', 
+                color='color',
                 zoom=15, 
                 use_container_width=True
                 )
+        st.caption(f"{t('Cells')}: {len(points)} · {t('Grievances')}: {sum(p['count'] for p in points)}")
 
     else:
         st.warning(t("No location data available for plotting the geographic map."))
 
+    st.markdown(f"### {t('Detected Clusters')}")
+    if clusters:
+        for cluster in clusters:
+            st.warning(f"🚨 {describe_cluster(cluster)}  \n{t('Reference No.')}: {', '.join(cluster['ids'])}")
+    else:
+        st.caption(t("No clusters of related grievances detected recently."))
+
+    with st.expander(t("Location Back-fill")):
+        st.caption(t("Re-resolves the coordinates of stored grievances from the local gazetteer."))
+        only_missing = st.checkbox(t("Only grievances without coordinates"), value=True, key="backfill_only_missing")
+        if st.button(t("Re-geocode Grievances"), key="backfill_locations_btn"):
+            with st.spinner(t("Geocoding...")):
+                changed = backfill_locations(only_missing)
+            st.success(f"{t('Updated locations')}: {changed}")
+
 
 def admin_analysis_ui():
-    """Admin UI for Status Breakdown by Category chart."""
+    """Admin UI for Status Breakdown by Category chart (read from the persisted counters)."""
     st.markdown(f"## {t('admin_tab_analysis')}: Grievance Status Breakdown")
     
-    data = list_complaints()
-    if not data:
+    english = get_catalogue().messages('en')
+    category_status = complaint_stats("category_status")
+    if not category_status:
         st.info(t("No grievance data submitted for performance analysis."))
         return
-        
-    df = pd.DataFrame(data)
-    
-    # Translate keys to English for reliable Pandas grouping
-    df['status'] = df['status'].apply(lambda x: TRANSLATIONS['en'].get(x, x))
-    df['category'] = df['category'].apply(lambda x: TRANSLATIONS['en'].get(x, x))
     
     st.markdown(f"### {t('Grievance Volume by Category and Resolution Status')}")
     
-    status_counts = df.groupby(['category', 'status']).size().reset_index(name=t('Count'))
-
-    if not status_counts.empty:
-        st.bar_chart(
-            status_counts, 
-            x='category', 
-            y=t('Count'), 
-            color='status',
-            use_container_width=True
-        )
-        st.caption(t("Total count of grievances categorized by type and their current processing status."))
-    else:
-        st.info(t("Insufficient data for status breakdown chart."))
+    # Keys are translated to English on the small pre-aggregated table only
+    status_counts = pd.DataFrame(
+        [(english.get(category, category), english.get(status, status), count) for category, status, count in category_status],
+        columns=['category', 'status', t('Count')],
+    )
+
+    st.bar_chart(
+        status_counts, 
+        x='category', 
+        y=t('Count'), 
+        color='status',
+        use_container_width=True
+    )
+    st.caption(t("Total count of grievances categorized by type and their current processing status."))
+
+    col_priority, col_department = st.columns(2)
+    with col_priority:
+        st.markdown(f"#### {t('Priority')}")
+        priority_counts = sorted(complaint_stats("priority"), key=lambda s: -PRIORITY_RANK.get(s[0], 0))
+        st.dataframe(pd.DataFrame(
+            [(t(priority), count) for priority, _, count in priority_counts],
+            columns=[t('Priority'), t('Count')],
+        ), hide_index=True, use_container_width=True)
+    with col_department:
+        st.markdown(f"#### {t('Department')}")
+        department_counts = sorted(complaint_stats("department"), key=lambda s: -s[2])
+        st.dataframe(pd.DataFrame(
+            [(department or t("Not Yet Assigned"), count) for department, _, count in department_counts],
+            columns=[t('Department'), t('Count')],
+        ), hide_index=True, use_container_width=True)
+
+    with st.expander(t("Priority Rules")):
+        classifier = get_priority_classifier()
+        st.caption(f"{t('Rule file')}: {PRIORITY_RULES_JSON.name} · {t('High-risk categories')}: {', '.join(t(c) for c in sorted(classifier.high_risk))}")
+        st.dataframe(pd.DataFrame([{
+            t('Priority'): t(level["priority"]),
+            "SLA (days)": level["sla_days"],
+            t('Keywords'): ", ".join(k for words in level["keywords"].values() for k in words),
+        } for level in classifier.levels]), hide_index=True, use_container_width=True)
+        if st.button(t("Re-classify All Grievances"), key="reclassify_btn"):
+            with st.spinner(t("Re-classifying...")):
+                changed = reclassify_complaints()
+            st.success(f"{t('Grievances with a new priority')}: {changed}")
+
+    with st.expander(t("Translation Coverage")):
+        catalogue = get_catalogue()
+        misses = catalogue.miss_report()
+        st.caption(f"{t('Locale files')}: {', '.join(p.name for p in sorted(LOCALE_DIR.glob('*.json')))} · {t('Untranslated keys seen since start-up')}: {len(misses)}")
+        if misses:
+            st.dataframe(pd.DataFrame(misses, columns=[t("Language"), t("Key"), t("Hits")]), hide_index=True, use_container_width=True)
+            english = catalogue.messages(SOURCE_LANGUAGE)
+            todo = {}
+            for miss_lang, key, _ in misses:
+                todo.setdefault(miss_lang, {})[key] = english.get(key, key)
+            st.download_button(
+                label=t("Download Missing Keys (JSON)"),
+                data=json.dumps(todo, ensure_ascii=False, indent=4),
+                file_name="missing_translations.json",
+                mime="application/json",
+                key="missing_translations_btn",
+            )
+        if st.button(t("Reload Locale Files"), key="reload_locales_btn"):
+            catalogue.reload()
+            st.rerun()
 
 
 def admin_review_feedback_ui():
@@ -1226,27 +3988,144 @@ def admin_review_feedback_ui():
         st.markdown("\n")
 
 
+EXPORT_POLL_SECONDS = 2 # refresh interval of the jobs list while an export is running
+EXPORT_IDLE_POLL_SECONDS = 15 # how often an idle jobs list checks for exports queued from other sessions
+
+@st.fragment(run_every=EXPORT_IDLE_POLL_SECONDS)
+def export_jobs_ui():
+    """Shows the export jobs list, polling it quickly only while a job is queued or running.
+
+    The check runs inside this slow-polling fragment, so an export queued from
+    another session starts the fast refresh and a finished one stops it
+    without a full rerun of the admin page.
+    """
+    if any(job["state"] in ("queued", "running") for job in get_export_jobs().list()):
+        st.fragment(export_jobs_list, run_every=EXPORT_POLL_SECONDS)()
+    else:
+        export_jobs_list()
+
+def export_jobs_list():
+    """Lists background export jobs with their progress and a download for finished files."""
+    jobs = get_export_jobs().list()
+    if not jobs:
+        st.caption(t("No export jobs yet."))
+        return
+    for job in jobs:
+        filters = job["filters"]
+        described = ", ".join(filter(None, [
+            f"{filters['date_from']} – {filters['date_to']}" if filters["date_from"] else "",
+            t(filters["status"]) if filters["status"] else "",
+            (filters["department"] or t("Not Yet Assigned")) if filters["department"] is not None else "",
+        ])) or t("All")
+        st.markdown(f"**{job['id']}** · {job['format'].upper()} · {described} · *{job['owner']}*")
+        if job["state"] in ("queued", "running"):
+            done = job["written"] / job["rows"] if job["rows"] else 0.0
+            st.progress(done, text=f"{t(job['state'].capitalize())}: {job['written']}/{job['rows']}")
+        elif job["state"] == "done":
+            extension, mime = EXPORT_FORMATS[job["format"]]
+            filtered = any(value is not None for value in filters.values())
+            st.download_button(
+                label=t("download_filtered_data" if filtered else "download_data", format=job["format"].upper(), rows=job["rows"]),
+                data=Path(job["path"]).read_bytes, # Read only when clicked
+                file_name=Path(job["path"]).name,
+                mime=mime,
+                on_click="ignore",
+                key=f"export_job_download_{job['id']}",
+            )
+        else:
+            st.error(f"{t('Export failed')}: {job['error']}")
+
 def admin_manage_complaints_ui(current_user):
     """Admin UI for viewing and updating all citizen complaints, split into tabs."""
     st.markdown(f"## {t('admin_manage_title')}")
-    data = list_complaints()
-    
-    if not data:
-        st.info(t("No grievances have been filed by citizens yet."))
-        return
 
-    # Sort data by Priority KEY (Emergency first) and then by creation date
-    priority_order = {"priority_emergency": 3, "priority_high": 2, "priority_standard": 1}
-    data.sort(key=lambda x: (priority_order.get(x.get('priority', 'priority_standard'), 1), x.get('created_at', '2000-01-01T00:00:00')), reverse=True)
+    # --- SEARCH: ranked full-text results across grievances, posts and announcements ---
+    search_query = st.text_input(t("🔍 Search grievances, community posts and announcements"), key="admin_search_query", placeholder=t("Reference no., house, keywords..."))
+    if search_query.strip():
+        results = search_portal(search_query)
+        if not results:
+            st.info(t("No matches found."))
+        for table, row in results:
+            if table == "complaints":
+                st.markdown(f"📋 **{row['id']}** · {t(row.get('category', ''))} · {t(row.get('status', 'status_open'))} · {row.get('house', '')} · {row.get('username', '')}")
+                text = row.get("description", "")
+            elif table == "posts":
+                st.markdown(f"💬 {t('Community post')} · {row.get('username', '')} · {row.get('created_at', '')[:10]}")
+                text = row.get("content", "")
+            else:
+                st.markdown(f"📢 {t('Announcement')} · {row.get('created_at', '')[:10]}")
+                text = row.get("content", "")
+            st.caption(text if len(text) <= 200 else text[:197] + "...")
+        st.markdown("---")
 
+    if not count_complaints():
+        st.info(t("No grievances have been filed by citizens yet."))
+        return
 
     tab_management, tab_export = st.tabs([t("Individual Grievance Processing"), t("Data Export and Review")])
 
     with tab_management:
         st.subheader(t("Active and Pending Grievances (Prioritized List)"))
+
+        # --- TRIAGE: next N most urgent open grievances, straight from the triage heap ---
+        with st.expander(t("⚡ Most Urgent Open Grievances")):
+            urgent_count = st.number_input(t("Show next"), min_value=1, max_value=50, value=URGENT_QUEUE_DEFAULT, step=1, key="urgent_count")
+            urgent = next_urgent_complaints(int(urgent_count))
+            if urgent:
+                st.dataframe(pd.DataFrame([{
+                    "ID": c["id"],
+                    t("Priority"): t(c.get("priority", "priority_standard")),
+                    t("Status"): t(c.get("status", "status_open")),
+                    t("Category"): t(c.get("category", "")),
+                    t("Department"): c.get("department") or t("Not Yet Assigned"),
+                    "SLA Due": c.get("sla_due", ""),
+                } for c in urgent]), hide_index=True, use_container_width=True)
+            else:
+                st.caption(t("No open grievances."))
+
+        # --- CLUSTER ALERTS: related grievances close together in space and time ---
+        clusters = detected_clusters()
+        clustered = {cid: cluster for cluster in clusters for cid in cluster["ids"]}
+        for cluster in clusters:
+            st.warning(f"🚨 {t('Hotspot cluster')}: {describe_cluster(cluster)}")
+
+        # --- QUEUE FILTERS: applied by the storage engine before any card is built ---
+        status_filter_keys = [None, "status_open", "status_in_progress", "status_resolved"]
+        priority_filter_keys = [None, "priority_emergency", "priority_high", "priority_standard"]
+        department_filter_values = [None] + get_storage().distinct("complaints", "department")
+
+        filter_cols = st.columns([2, 2, 2, 1])
+        with filter_cols[0]:
+            status_filter = st.selectbox(t("Status"), status_filter_keys, format_func=lambda k: t("All") if k is None else t(k), key="queue_status_filter")
+        with filter_cols[1]:
+            priority_filter = st.selectbox(t("Priority"), priority_filter_keys, format_func=lambda k: t("All") if k is None else t(k), key="queue_priority_filter")
+        with filter_cols[2]:
+            department_filter = st.selectbox(t("Department"), department_filter_values, format_func=lambda d: t("All") if d is None else (d or t("Not Yet Assigned")), key="queue_department_filter")
+        with filter_cols[3]:
+            page_size = st.selectbox(t("Page Size"), ADMIN_QUEUE_PAGE_SIZES, index=1, key="queue_page_size")
+        overdue_only = st.checkbox(t("Show only grievances past their SLA"), key="queue_overdue_filter")
+
+        if "queue_page" not in st.session_state:
+            st.session_state.queue_page = 1
+        queue_filters = dict(status=status_filter, priority=priority_filter, department=department_filter, overdue=overdue_only)
+        page_data, total = query_complaints(**queue_filters, page=st.session_state.queue_page, page_size=page_size)
+        page_count = max(-(-total // page_size), 1)
+        if st.session_state.queue_page > page_count:
+            st.session_state.queue_page = page_count
+            page_data, total = query_complaints(**queue_filters, page=page_count, page_size=page_size)
+
+        col_page, col_caption = st.columns([1, 3])
+        with col_page:
+            st.number_input(t("Page"), min_value=1, max_value=page_count, step=1, key="queue_page")
+        with col_caption:
+            first_shown = (st.session_state.queue_page - 1) * page_size + 1 if total else 0
+            st.caption(f"{t('Showing')} {first_shown}-{first_shown + len(page_data) - 1 if total else 0} / {total}")
         st.markdown("---")
+
+        if not page_data:
+            st.info(t("No grievances match the selected filters."))
         
-        for idx, c in enumerate(data): 
+        for idx, c in enumerate(page_data): 
             
             # Retrieve keys from CSV
             status_key = c.get('status', 'status_open')
@@ -1321,6 +4200,10 @@ def admin_manage_complaints_ui(current_user):
                 # --- COMPLAINT DETAILS ROW ---
                 st.markdown(f"### {t('Reference No.')} <span style='color:#0077b6;'>{complaint_id}</span>: {t(c['category'])}", unsafe_allow_html=True)
                 st.caption(f"{t('Filed by')}: **{c['username']}** | {t('Location')}: {c['house']} | {t('Date')}: {c['created_at'].split('T')[0]}")
+                if complaint_id in clustered:
+                    st.caption(f"🚨 {t('Part of hotspot cluster')}: {describe_cluster(clustered[complaint_id])}")
+                if c.get("duplicate_of"):
+                    st.caption(f"🔁 {t('possible_duplicate_of', ids=c['duplicate_of'])}")
 
 
                 with st.expander(t("Grievance Details and Resolution Action"), expanded=(status_key == 'status_open' or priority_key == 'priority_emergency')):
@@ -1331,7 +4214,7 @@ def admin_manage_complaints_ui(current_user):
                     if c["attachment"]:
                         file_path = UPLOAD_DIR / c["attachment"]
                         if file_path.exists():
-                            st.download_button(t("Download Attached Supporting Document"), file_path.read_bytes(), c["attachment"], key=f"admin_download_{complaint_id}")
+                            st.download_button(t("Download Attached Supporting Document"), file_path.read_bytes, file_path.name, on_click="ignore", key=f"admin_download_{complaint_id}")
                     
                     st.markdown("---")
                     st.markdown(f"#### **{t('admin_action')}**")
@@ -1364,7 +4247,7 @@ def admin_manage_complaints_ui(current_user):
                             
                             if st.form_submit_button(t("execute_status"), type="primary", use_container_width=True):
                                 if update_complaint_status(complaint_id, new_status_key, current_dept, current_notes):
-                                    st.success(t(f"Grievance status successfully updated to **{new_status_display}**."))
+                                    st.success(t("status_updated", status=new_status_display))
                                     st.rerun()
                                 else:
                                     st.error(t("Error executing status update."))
@@ -1395,22 +4278,96 @@ def admin_manage_complaints_ui(current_user):
     with tab_export:
         st.subheader(t("Full Grievance Data Table"))
 
-        st.caption(t("Complete, scrollable data set of all citizen grievances."))
-        st.dataframe(pd.DataFrame(data).sort_values(by='created_at', ascending=False).reset_index(drop=True), use_container_width=True, height=500)
+        st.caption(t("Complete data set of all citizen grievances, newest first, one page at a time."))
+        table_page_size = st.selectbox(t("Page Size"), ADMIN_QUEUE_PAGE_SIZES, index=len(ADMIN_QUEUE_PAGE_SIZES) - 1, key="data_table_page_size")
+        if "data_table_page" not in st.session_state:
+            st.session_state.data_table_page = 1
+        table_total = count_complaints()
+        table_page_count = max(-(-table_total // table_page_size), 1)
+        if st.session_state.data_table_page > table_page_count:
+            st.session_state.data_table_page = table_page_count
+        table_rows, _ = get_storage().query(
+            "complaints", order=[("created_at", True, None)],
+            limit=table_page_size, offset=(st.session_state.data_table_page - 1) * table_page_size,
+        )
+        col_page, col_caption = st.columns([1, 3])
+        with col_page:
+            st.number_input(t("Page"), min_value=1, max_value=table_page_count, step=1, key="data_table_page")
+        with col_caption:
+            first_shown = (st.session_state.data_table_page - 1) * table_page_size + 1 if table_total else 0
+            st.caption(f"{t('Showing')} {first_shown}-{first_shown + len(table_rows) - 1 if table_total else 0} / {table_total}")
+        st.dataframe(pd.DataFrame(table_rows, columns=COMPLAINT_HEADER), use_container_width=True, height=500)
 
         st.markdown("---")
 
-        excel_data = complaints_to_excel(data)
+        export_format = st.radio(t("Export Format"), list(EXPORT_FORMATS), format_func=str.upper, horizontal=True, key="export_format")
+        extension, mime = EXPORT_FORMATS[export_format]
 
         st.download_button(
-            label=t("download_data"),
-            data=excel_data,
-            file_name=f"Grievance_Report_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            label=t("download_data", format=export_format.upper()),
+            data=partial(complaints_export, export_format), # Built only when clicked
+            on_click="ignore",
+            file_name=f"Grievance_Report_{datetime.now().strftime('%Y%m%d_%H%M')}.{extension}",
+            mime=mime,
             type="primary",
             use_container_width=True
         )
 
+        st.markdown("---")
+        st.subheader(t("Background Exports"))
+        st.caption(t("Filtered exports are built in the background; download them from the list below once finished."))
+        with st.form("export_job_form"):
+            job_cols = st.columns(4)
+            with job_cols[0]:
+                job_dates = st.date_input(t("Filed Between"), value=(), key="export_job_dates")
+            with job_cols[1]:
+                job_status = st.selectbox(t("Status"), status_filter_keys, format_func=lambda k: t("All") if k is None else t(k), key="export_job_status")
+            with job_cols[2]:
+                job_department = st.selectbox(t("Department"), department_filter_values, format_func=lambda d: t("All") if d is None else (d or t("Not Yet Assigned")), key="export_job_department")
+            with job_cols[3]:
+                job_format = st.selectbox(t("Export Format"), list(EXPORT_FORMATS), format_func=str.upper, key="export_job_format")
+            if st.form_submit_button(t("Queue Export"), type="primary"):
+                get_export_jobs().submit(current_user["username"], job_format, {
+                    "date_from": job_dates[0] if job_dates else None,
+                    "date_to": job_dates[-1] if job_dates else None,
+                    "status": job_status,
+                    "department": job_department,
+                })
+                st.toast(t("Export queued."))
+
+        export_jobs_ui()
+
+        st.markdown("---")
+        with st.expander(t("Shared Read Cache (this server process)")):
+            st.json(get_table_cache().stats())
+
+        with st.expander(t("Storage Lock Contention (this server process)")):
+            lock_stats = get_lock_metrics().snapshot()
+            if lock_stats:
+                st.dataframe(pd.DataFrame(lock_stats), use_container_width=True)
+            else:
+                st.caption(t("No writer lock activity has been recorded yet."))
+
+        with st.expander(t("Statistics Counters")):
+            st.caption(t("Analysis and map counters are updated with each change; a recount rebuilds them from the grievances table."))
+            if st.button(t("Recount Statistics"), key="recount_counters_btn"):
+                with st.spinner(t("Recounting...")):
+                    fixed = recount_complaint_counters()
+                st.success(f"{t('Counters corrected')}: {fixed}")
+
+        if get_storage().name == "sqlite":
+            with st.expander(t("Legacy CSV Files")):
+                st.caption(t("The SQLite database is the live store; the CSV files are only updated or read back on request."))
+                col_csv_export, col_csv_import = st.columns(2)
+                with col_csv_export:
+                    if st.button(t("Write Tables to CSV"), key="csv_export_btn", use_container_width=True):
+                        written = export_tables_to_csv()
+                        st.success(f"{t('Rows written')}: {sum(written.values())}")
+                with col_csv_import:
+                    if st.button(t("Import New Rows from CSV"), key="csv_import_btn", use_container_width=True):
+                        added = import_tables_from_csv()
+                        st.success(f"{t('Rows added')}: {sum(added.values())}")
+
 
 # -------------------------
 # Main App Flow
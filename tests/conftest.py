@@ -0,0 +1,24 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parent.parent
+APP_FILES = ["testing.py", "gazetteer.csv", "priority_rules.json", "assistant_intents.json", "locales"]
+
+
+@pytest.fixture(scope="session")
+def portal(tmp_path_factory):
+    """The app's functions, loaded (up to the main app flow) from a copy in a temp directory."""
+    target = tmp_path_factory.mktemp("portal")
+    for name in APP_FILES:
+        source = APP_DIR / name
+        if source.is_dir():
+            shutil.copytree(source, target / name)
+        elif source.exists():
+            shutil.copy(source, target / name)
+    code = (target / "testing.py").read_text(encoding="utf-8")
+    code = code[: code.index("# Main App Flow")]
+    namespace = {"__file__": str(target / "testing.py"), "__name__": "portal"}
+    exec(compile(code, str(target / "testing.py"), "exec"), namespace)
+    return namespace
@@ -0,0 +1,48 @@
+import io
+
+import pytest
+
+
+def upload(name, data):
+    f = io.BytesIO(data)
+    f.name = name
+    return f
+
+
+@pytest.mark.parametrize("kind", ["complaint", "post", "announcement"])
+def test_caption_states_the_enforced_limit(portal, kind):
+    limit_mb, _ = portal["ATTACHMENT_RULES"][kind]
+    assert f"{limit_mb} MB" in portal["attachment_limits_caption"](kind)
+
+
+def test_upload_over_the_limit_is_rejected(portal):
+    limit_mb, _ = portal["ATTACHMENT_RULES"]["complaint"]
+    store = portal["get_attachment_store"]()
+    with pytest.raises(ValueError):
+        store.save(upload("big.pdf", b"%PDF-" + bytes(limit_mb << 20)), "complaint")
+    assert store.save(upload("ok.pdf", b"%PDF-" + bytes((limit_mb - 1) << 20)), "complaint")
+
+
+def test_identical_uploads_share_one_file(portal):
+    store = portal["get_attachment_store"]()
+    data = b"\x89PNG\r\n\x1a\n" + b"same image"
+    assert store.save(upload("a.png", data), "post") == store.save(upload("b.PNG", data), "post")
+
+
+def test_discard_keeps_a_file_another_upload_still_claims(portal):
+    store = portal["get_attachment_store"]()
+    data = b"\x89PNG\r\n\x1a\n" + b"pending twice"
+    first = store.save(upload("a.png", data), "complaint")
+    second = store.save(upload("b.png", data), "complaint")
+    store.discard(first)
+    assert store.path(second).exists()
+    store.discard(second)
+    assert not store.path(second).exists()
+
+
+def test_rejection_carries_a_key_not_a_translation(portal):
+    store = portal["get_attachment_store"]()
+    with pytest.raises(portal["AttachmentError"]) as rejected:
+        store.save(upload("notes.txt", b"plain text"), "post")
+    assert rejected.value.key == "attachment_wrong_type"
+    assert rejected.value.params["allowed"] == "JPG, PNG"
@@ -0,0 +1,24 @@
+RULE = {"category": "Water Supply", "radius_m": 100, "window_hours": 48, "min_points": 4}
+
+
+def grid_with(portal, points):
+    grid = portal["DensityGrid"](RULE)
+    for cid, metres_north in points:
+        grid.add(cid, 12.9 + metres_north / portal["METRES_PER_DEGREE"], 76.6, 0)
+    return grid
+
+
+def test_border_point_does_not_bridge_clusters(portal):
+    # Edge cores a0 and b0 are 180 m apart; the border point is 90 m from each
+    grid = grid_with(portal, [
+        ("a0", 0), ("a1", -30), ("a2", -60),
+        ("b0", 180), ("b1", 210), ("b2", 240),
+        ("border", 90),
+    ])
+    clusters = sorted(sorted(ids) for ids in grid.clusters())
+    assert clusters == [["a0", "a1", "a2", "border"], ["b0", "b1", "b2"]]
+
+
+def test_isolated_points_are_noise(portal):
+    grid = grid_with(portal, [("a0", 0), ("a1", 30), ("far", 1000)])
+    assert grid.clusters() == []
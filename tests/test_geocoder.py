@@ -0,0 +1,32 @@
+import pytest
+
+
+@pytest.mark.parametrize("house, expected", [
+    ("C-81", "C-81"),
+    ("c 81", "C-81"),
+    ("Block C, No. 81", "C-81"),
+    ("81 C Block", "C-81"),
+    ("Flat 101, Block B", "B-101"),
+    ("House 12 Block D", "D-12"),
+    ("D/12", "D-12"),
+    ("Plot No. 45", "45"),
+    ("", ""),
+])
+def test_normalize_address(portal, house, expected):
+    assert portal["normalize_address"](house) == expected
+
+
+@pytest.mark.parametrize("forms", [
+    ["House 12 Block D", "D/12", "d-12", "Block D, No. 12"],
+    ["Flat 101, Block B", "B 101", "Block B Flat 101"],
+])
+def test_word_order_gives_one_key(portal, forms):
+    assert len({portal["normalize_address"](house) for house in forms}) == 1
+
+
+def test_block_address_resolves_near_block(portal):
+    geocoder = portal["Geocoder"](portal["GAZETTEER_CSV"], portal["BASE_DIR"] / "memo_test.jsonl")
+    block_lat, block_lon = geocoder.gazetteer["B"]
+    lat, lon = geocoder.locate("Flat 101, Block B")
+    spread = portal["BLOCK_SPREAD"]
+    assert abs(lat - block_lat) <= spread and abs(lon - block_lon) <= spread